@@ -0,0 +1,88 @@
+import argparse
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+T0 = 1700000000000
+UNUSED_METRICS = ["Temperature", "Battery Level", "CPU running", "Charging status", "Health", "Plug"]
+APPS = ["com.example.app", "com.android.chrome", "com.google.android.youtube", "com.whatsapp"]
+
+def write_history(path, target_mb, seed=1):
+    # CSV Battery Historian synthétique : un événement par seconde pour chaque métrique, à tour de rôle
+    from core.utils.csv_handler import METRICS
+
+    rng = random.Random(seed)
+    metrics = METRICS + UNUSED_METRICS
+    target = target_mb * 1024 * 1024
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("metric,type,start_time,end_time,value,opt\n")
+        t = T0
+        while f.tell() < target:
+            for metric in metrics:
+                duration = rng.randint(200, 2000)
+                if metric in ("Top app", "Wakelock_in"):
+                    value = rng.choice(APPS)
+                elif metric in ("Voltage", "Coulomb charge", "Temperature", "Battery Level"):
+                    value = rng.randint(1000, 4200)
+                else:
+                    value = "true"
+                f.write(f"{metric},int,{t},{t + duration},{value},\n")
+            t += 1000
+    return t
+
+def child(path, memory_budget, init_test_time, end_test_time):
+    from core.utils import csv_handler as csv
+
+    csv.DUMP_DIR = Path(path).parent
+    start = time.perf_counter()
+    tables = csv.generate_files(
+        Path(path).name,
+        memory_budget=memory_budget or None,
+        init_test_time=init_test_time if memory_budget else None,
+        end_test_time=end_test_time if memory_budget else None
+    )
+    elapsed = time.perf_counter() - start
+    rows = sum(len(table) for table in tables.values())
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{peak_kb} {elapsed:.3f} {rows}")
+
+def measure(path, memory_budget, init_test_time, end_test_time):
+    output = subprocess.check_output(
+        [sys.executable, __file__, "--child", str(path), str(memory_budget), str(init_test_time), str(end_test_time)],
+        text=True
+    )
+    peak_kb, elapsed, rows = output.split()
+    return int(peak_kb) / 1024, float(elapsed), int(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak RSS of generate_files() against battery_device.csv size")
+    parser.add_argument("--sizes", default="10,50,200", help="file sizes to generate, in MB, separated by comma")
+    parser.add_argument("--memory-budget", type=float, default=32, help="memory budget of the chunked reader, in MB")
+    parser.add_argument("--window", type=float, default=0.1, help="share of the history kept as recording window")
+    args = parser.parse_args()
+
+    print(f"{'file (MB)':>10} {'mode':>14} {'peak RSS (MB)':>14} {'time (s)':>9} {'rows kept':>10}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in [float(s) for s in args.sizes.split(",")]:
+            path = Path(tmp_dir) / "battery_device.csv"
+            end = write_history(path, size)
+            file_mb = os.path.getsize(path) / (1024 * 1024)
+            init_test_time = T0 + int((end - T0) * (1 - args.window) / 2)
+            end_test_time = init_test_time + int((end - T0) * args.window)
+            for label, budget in (("full", 0), (f"chunked {args.memory_budget:g}MB", args.memory_budget)):
+                peak, elapsed, rows = measure(path, budget, init_test_time, end_test_time)
+                print(f"{file_mb:>10.1f} {label:>14} {peak:>14.1f} {elapsed:>9.2f} {rows:>10}")
+
+if __name__ == "__main__":
+    if len(sys.argv) == 6 and sys.argv[1] == "--child":
+        child(sys.argv[2], float(sys.argv[3]), int(sys.argv[4]), int(sys.argv[5]))
+    else:
+        main()
@@ -0,0 +1,60 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from bench_ingest import T0, write_history
+
+def timed(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Write and read times of the interval table: CSV against parquet, feather and arrow")
+    parser.add_argument("--size", type=float, default=50, help="size of the synthetic battery history, in MB")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measure, the best one is kept")
+    args = parser.parse_args()
+
+    import pandas
+    from core.utils import csv_handler as csv
+    from core.utils import columnar_writer as columnar
+
+    if not columnar.is_available():
+        print("[PowDroid] The pyarrow module is needed: pip install pyarrow")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "battery_device.csv"
+        end = write_history(path, args.size)
+        csv.DUMP_DIR = Path(tmp_dir)
+        tables = csv.generate_files(path.name)
+        output_df = csv.interval_table(T0, end, tables)
+        stem = os.path.join(tmp_dir, "PowDroid")
+        print(f"{len(output_df)} intervals: {output_df.memory_usage(deep=True).sum() / (1024 * 1024):.1f} MB as DataFrame, "
+              f"{csv.session_intervals(tables).nbytes / (1024 * 1024):.1f} MB as IntervalTable")
+
+        print(f"{'format':>8} {'write (s)':>10} {'read (s)':>9} {'size (MB)':>10}")
+        csv_path = stem + ".csv"
+        write, _ = timed(lambda: csv.write_csv_file(output_df, csv_path), args.repeat)
+        read, _ = timed(lambda: pandas.read_csv(csv_path), args.repeat)
+        print(f"{'csv':>8} {write:>10.3f} {read:>9.3f} {os.path.getsize(csv_path) / (1024 * 1024):>10.1f}")
+
+        for output_format in columnar.COLUMNAR_FORMATS:
+            # La conversion Arrow fait partie de l'écriture, comme to_csv pour le CSV
+            write, paths = timed(lambda: columnar.write_outputs(output_df, stem, [output_format]), args.repeat)
+            read, _ = timed(lambda: columnar.read_table(paths[output_format]), args.repeat)
+            size = os.path.getsize(paths[output_format]) / (1024 * 1024)
+            print(f"{output_format:>8} {write:>10.3f} {read:>9.3f} {size:>10.1f}")
+
+if __name__ == "__main__":
+    main()
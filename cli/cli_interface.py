@@ -1,7 +1,51 @@
 from core.utils import adb_runner as adb
 from core.utils import csv_handler as csv
 from core.utils import html_renderer as html
+from core.utils import history_parser as history
+from core.utils import live_collector as live
+from core.utils import session_cache
+from core.utils import columnar_writer as columnar
+from core.utils import report_windows
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager, redirect_stdout
 from datetime import datetime
+from pathlib import Path
+import json
+import multiprocessing
+import os
+import time
+
+MAX_WORKERS = 8
+SESSION_FILE = "session.json"  # fenêtre d'enregistrement, à côté du dump, pour --replay
+MANIFEST_FILE = "manifest.jsonl"
+BATCH_LOG_FILE = "powdroid_log.txt"
+WORKER_ATTEMPTS = 2  # un dump qui fait tomber deux fois son processus (seul dans le pool) est marqué en échec
+
+@contextmanager
+def stage(stage_timings, name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if stage_timings is not None:
+            stage_timings[name] = round(time.perf_counter() - start, 3)
+
+def to_timestamp_ms(dt):
+    return int(dt.timestamp() * 1000) if isinstance(dt, datetime) else dt
+
+def write_session_window(dump_dir, start_user_session, stop_user_session):
+    dump_dir = Path(dump_dir)
+    dump_dir.mkdir(parents=True, exist_ok=True)
+    window = {"start": to_timestamp_ms(start_user_session), "stop": to_timestamp_ms(stop_user_session)}
+    (dump_dir / SESSION_FILE).write_text(json.dumps(window) + "\n", encoding="utf-8")
+
+def read_session_window(dump_dir):
+    try:
+        window = json.loads((Path(dump_dir) / SESSION_FILE).read_text(encoding="utf-8"))
+        return int(window["start"]), int(window["stop"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None, None
 
 def initialize_connection(verbose):
     print("[PowDroid Step 1/4] Initializing device connection...")
@@ -15,14 +59,20 @@ def initialize_connection(verbose):
         print(f"[PowDroid] Device {connected_device} connected." if verbose else "[PowDroid] Device already connected.")
     adb.kill_all()
     adb.clear_batterystats(verbose)
+    return connected_device
 
-def record_session(verbose):
+def record_session(verbose, collector=None, usb_device=None):
     print("[PowDroid Step 2/4] Starting session recording...")
-    print("[PowDroid] Please unplug your device and follow the instructions.")
-    adb.wait_for_device_disconnection(verbose)
+    if collector:
+        print("[PowDroid] Please unplug the USB cable, the device stays connected over TCP.")
+    else:
+        print("[PowDroid] Please unplug your device and follow the instructions.")
+    adb.wait_for_device_disconnection(verbose, usb_device)
 
     input("=> Press ENTER to start recording your test session.")
     start_user_session = datetime.now()
+    if collector:
+        collector.start()
     print(f"[PowDroid] Recording in progress from {start_user_session.strftime('%Y-%m-%d %H:%M:%S')}")
 
     input("=> Press ENTER once you finished your test session.")
@@ -48,43 +98,337 @@ def record_session(verbose):
 
     return start_user_session, stop_user_session
 
-def process_batterystats(verbose):
+def process_batterystats(verbose, timings=False, parser="go", capture="full", stream=False):
     print("[PowDroid Step 3/4] Processing battery data...")
     print("[PowDroid] Please reconnect your device via USB.")
     adb.wait_for_device_connection(verbose)
 
     print("[PowDroid] This step may take a few moments, please wait while processing collected data...")
 
-    adb.dump_batterystats(verbose)
-    file_name = adb.conversion_batterystats()
-    return file_name
+    if stream:
+        lines = adb.dump_batterystats_streaming(verbose, timings)
+        return None, csv.tables_from_rows(history.parse_history(lines))
 
-def generate_outputs(file_name, start_user_session, stop_user_session, output_formats, verbose):
-    print("[PowDroid Step 4/4] Generating output files...")
+    adb.dump_batterystats(verbose, capture, timings)
+    file_name = adb.conversion_batterystats(verbose, timings, parser)
+    return file_name, None
+
+def finish_live_session(collector, verbose, timings=False):
+    print("[PowDroid Step 3/4] Processing battery data...")
+    print("[PowDroid] Collecting the last battery history delta over TCP...")
+    start = time.perf_counter()
+    tables = collector.finish()
+    if timings:
+        print(f"[PowDroid] Last delta collected in {time.perf_counter() - start:.2f}s ({collector.deltas} deltas during the session)")
+    return tables
 
-    def to_timestamp_ms(dt):
-        return int(dt.timestamp() * 1000) if isinstance(dt, datetime) else dt
+def write_html_report(output_df, html_path):
+    html_path = html.process_html_frame(output_df, html_path)
+    print(f"[PowDroid] HTML file generated successfully: {html_path}")
+
+def generate_outputs(file_name, start_user_session, stop_user_session, output_formats, verbose, cache=False, memory_budget=None, tables=None, device=None, cache_size=0, timings=False, windows=None, stage_timings=None, output_dir=None):
+    if not device:
+        print("[PowDroid Step 4/4] Generating output files...")
 
     start_ts = to_timestamp_ms(start_user_session)
     stop_ts = to_timestamp_ms(stop_user_session)
+    output_dir = output_dir or (csv.OUTPUT_DIR / adb.device_dir_name(device) if device else None)
 
     csv_path = None
+    output_df = None
+    intervals = None
+    resolved = []
+    reports = []
+    columnar_formats = [f for f in output_formats if f in columnar.COLUMNAR_FORMATS]
 
-    if "csv" in output_formats or "html" in output_formats:
-        csv.generate_files(file_name)
-        csv_path = csv.process_csv_file(start_ts, stop_ts)
+    if "csv" in output_formats or "html" in output_formats or columnar_formats:
+        with stage(stage_timings, "tables"):
+            if tables is None and cache_size and not memory_budget:
+                # La lecture par morceaux ne garde que la fenêtre : elle ne passe pas par le cache de session
+                tables, intervals = session_cache.cached_session(csv.DUMP_DIR / file_name, cache_size, timings=timings)
+            elif tables is None:
+                # Sans --windows, seules les lignes de la fenêtre d'enregistrement sont gardées
+                window = (None, None) if windows else (start_ts, stop_ts)
+                tables = csv.generate_files(file_name, memory_budget=memory_budget, init_test_time=window[0], end_test_time=window[1])
+            if cache:
+                csv.write_metric_tables(tables, csv.TMP_DIR / adb.device_dir_name(device) if device else None)
+        with stage(stage_timings, "csv"):
+            if windows:
+                # Toutes les fenêtres sont découpées dans la même table des intervalles
+                resolved = report_windows.resolve_windows(windows, start_ts)
+                if intervals is None:
+                    intervals = csv.session_intervals(tables)
+                reports, summary_path = csv.process_windows(resolved, tables, output_dir, intervals)
+                print(f"[PowDroid] {len(resolved)} windows summary generated successfully: {summary_path}")
+            # Une seule table des intervalles pour tous les formats demandés
+            output_df = csv.interval_table(start_ts, stop_ts, tables, intervals)
+            stem = csv.output_stem(output_dir)
+            if output_df is not None and "csv" in output_formats:
+                csv_path = csv.write_csv_file(output_df, stem + ".csv")
+        if output_df is not None and columnar_formats:
+            with stage(stage_timings, "columnar"):
+                for output_format, path in columnar.write_outputs(output_df, stem, columnar_formats).items():
+                    print(f"[PowDroid] {output_format.capitalize()} file generated successfully: {path}")
 
     if "csv" in output_formats:
         print(f"[PowDroid] CSV file generated successfully: {csv_path}")
+        for label, window_path in reports:
+            if window_path:
+                print(f"[PowDroid] CSV file of window {label} generated successfully: {window_path}")
+
+    if "html" in output_formats and output_df is not None:
+        with stage(stage_timings, "html"):
+            # Rendu depuis les tables en mémoire, sans relire les CSV écrits
+            write_html_report(output_df, stem + ".html")
+            for (label, init_test_time, end_test_time), (_, window_path) in zip(resolved, reports):
+                if window_path:
+                    write_html_report(csv.window_intervals(intervals, init_test_time, end_test_time), window_path.rsplit(".", 1)[0] + ".html")
 
-    if "html" in output_formats:
-        html_content = html.process_html_file(csv_path)
-        html_path = csv_path.rsplit(".", 1)[0] + ".html"
-        with open(html_path, "w", encoding="utf-8") as f:
-            f.write(html_content)
-        print(f"[PowDroid] HTML file generated successfully: {html_path}")
+    return csv_path
+
+def replay(dump_dir, start_ts=None, stop_ts=None, output_formats=("csv",), verbose=False, parser="go", cache_size=0, windows=None, timings=False, output_dir=None, memory_budget=None):
+    # Retraite un dump existant sans téléphone ni interaction : conversion, tables, CSV, HTML
+    dump_dir = Path(dump_dir).resolve()
+    if start_ts is None or stop_ts is None:
+        session_start, session_stop = read_session_window(dump_dir)
+        start_ts = session_start if start_ts is None else start_ts
+        stop_ts = session_stop if stop_ts is None else stop_ts
+    if start_ts is None or stop_ts is None:
+        print(f"[Debug] ERROR | No recording window for {dump_dir}: use --start and --stop or add a {SESSION_FILE} file.")
+        return None
+
+    print(f"[PowDroid] Replaying {dump_dir} from {start_ts} to {stop_ts}")
+    stage_timings = {}
+    start = time.perf_counter()
+    csv_file = dump_dir / "battery_device.csv"
+    with stage(stage_timings, "conversion"):
+        if not csv_file.exists():
+            if not (dump_dir / "battery_device.zip").exists():
+                parser = "python"  # capture lite : pas de bugreport pour Battery Historian
+            adb.conversion_batterystats(verbose, timings, parser, dump_dir)
+    generate_outputs(
+        str(csv_file), start_ts, stop_ts, output_formats, verbose, memory_budget=memory_budget, cache_size=cache_size,
+        timings=timings, windows=windows, stage_timings=stage_timings, output_dir=output_dir
+    )
+    stage_timings["total"] = round(time.perf_counter() - start, 3)
+
+    if timings:
+        print("[PowDroid] Stage timings: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in stage_timings.items()))
+        (dump_dir / "timings.json").write_text(json.dumps(stage_timings) + "\n", encoding="utf-8")
+    return stage_timings
+
+def initialize_devices(verbose, workers):
+    print("[PowDroid Step 1/4] Initializing devices connection...")
+
+    devices = adb.get_connected_devices()
+    if not devices:
+        print("[PowDroid] No device detected. Please connect your devices via USB.")
+        adb.wait_for_device_connection(verbose)
+        devices = adb.get_connected_devices()
+    print(f"[PowDroid] {len(devices)} devices connected: {', '.join(devices)}")
+
+    def reset(device):
+        adb.kill_all(device)
+        adb.clear_batterystats(verbose, device)
+
+    with ThreadPoolExecutor(max_workers=workers or min(len(devices), MAX_WORKERS)) as pool:
+        list(pool.map(reset, devices))
+    return devices
+
+def process_device(device, start_user_session, stop_user_session, output_formats, verbose, cache, memory_budget, timings, parser, capture, stream, cache_size, windows):
+    dump_dir = adb.DUMP_DIR / adb.device_dir_name(device)
+    write_session_window(dump_dir, start_user_session, stop_user_session)
+    if stream:
+        lines = adb.dump_batterystats_streaming(verbose, timings, device, dump_dir, spinner=False)
+        file_name, tables = None, csv.tables_from_rows(history.parse_history(lines))
+    else:
+        adb.dump_batterystats(verbose, capture, timings, device, dump_dir, spinner=False)
+        file_name, tables = adb.conversion_batterystats(verbose, timings, parser, dump_dir), None
+    generate_outputs(file_name, start_user_session, stop_user_session, output_formats, verbose, cache, memory_budget, tables, device, cache_size, timings, windows)
+
+def process_devices(devices, workers, start_user_session, stop_user_session, output_formats, verbose, cache, memory_budget, timings, parser, capture, stream, cache_size, windows):
+    print("[PowDroid Step 3/4] Processing battery data...")
+    print("[PowDroid] Please reconnect all your devices via USB.")
+    adb.wait_for_devices_connection(devices, verbose)
+
+    print("[PowDroid Step 4/4] Generating output files...")
+    print(f"[PowDroid] Processing data of {len(devices)} devices in parallel, please wait...")
+    start = time.perf_counter()
+    failed = []
+    with ThreadPoolExecutor(max_workers=workers or min(len(devices), MAX_WORKERS)) as pool:
+        futures = {
+            pool.submit(
+                process_device, device, start_user_session, stop_user_session, output_formats,
+                verbose, cache, memory_budget, timings, parser, capture, stream, cache_size, windows
+            ): device
+            for device in devices
+        }
+        for future in as_completed(futures):
+            device = futures[future]
+            try:
+                future.result()
+                print(f"[PowDroid] Device {device} processed.")
+            except Exception as e:
+                failed.append(device)
+                print(f"[Debug] Error while processing device {device}: {e}")
+    print(f"[PowDroid] {len(devices) - len(failed)}/{len(devices)} devices processed in {time.perf_counter() - start:.1f}s")
+    return failed
+
+def find_sessions(root):
+    sessions = []
+    for directory, subdirs, files in os.walk(root):
+        subdirs[:] = sorted(d for d in subdirs if d != session_cache.CACHE_DIR.name)
+        if "battery_device.csv" in files or "batterystats.txt" in files:
+            sessions.append(Path(directory).resolve())
+    return sessions
+
+def read_manifest(path):
+    # Dernier état connu de chaque session ; une ligne tronquée par un crash est ignorée
+    records = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    records[record["session"]] = record
+                except (ValueError, KeyError):
+                    continue
+    except OSError:
+        pass
+    return records
+
+def append_manifest(path, record):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+def limit_worker_memory(memory_cap):
+    # Limite de l'espace d'adressage (RLIMIT_AS), pas de la mémoire résidente : les imports seuls
+    # réservent déjà ~330 Mo, d'où le minimum de --worker-memory vérifié par powdroid.py
+    try:
+        import resource
+        limit = int(memory_cap * 1024 * 1024)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError):
+        pass  # pas de limite d'espace d'adressage sous Windows
+
+started_sessions = None  # file des sessions lancées par ce processus du pool
+
+def init_worker(memory_cap, started):
+    global started_sessions
+    started_sessions = started
+    if memory_cap:
+        limit_worker_memory(memory_cap)
+
+def run_session(task, dump_dir, *args):
+    # Signale le lancement avant le traitement : après un crash, seules ces sessions sont suspectes
+    started_sessions.put(dump_dir)
+    return task(dump_dir, *args)
+
+def process_session(dump_dir, output_formats, parser, cache_size, memory_budget, windows):
+    start = time.perf_counter()
+    record = {"session": str(dump_dir)}
+    try:
+        with open(Path(dump_dir) / BATCH_LOG_FILE, "w", encoding="utf-8") as log, redirect_stdout(log):
+            stage_timings = replay(
+                dump_dir, output_formats=output_formats, parser=parser, cache_size=cache_size,
+                windows=windows, timings=True, output_dir=dump_dir, memory_budget=memory_budget
+            )
+        if stage_timings is None:
+            record.update(status="failed", error=f"no recording window ({SESSION_FILE})")
+        else:
+            record.update(status="done", stages=stage_timings)
+    except MemoryError:
+        record.update(status="failed", error="memory cap exceeded")
+    except Exception as e:
+        record.update(status="failed", error=f"{type(e).__name__}: {e}")
+    record["seconds"] = round(time.perf_counter() - start, 3)
+    return record
+
+def batch(root, output_formats=("csv",), workers=None, memory_cap=None, parser="go", cache_size=0, memory_budget=None, windows=None, task=process_session):
+    root = Path(root).resolve()
+    manifest_path = root / MANIFEST_FILE
+    sessions = find_sessions(root)
+    done = {session for session, record in read_manifest(manifest_path).items() if record.get("status") == "done"}
+    pending = [session for session in sessions if str(session) not in done]
+    print(f"[PowDroid] {len(sessions)} sessions found in {root}, {len(sessions) - len(pending)} already processed.")
+    if not pending:
+        return []
+
+    if parser == "go" and any(not (s / "battery_device.csv").exists() and (s / "battery_device.zip").exists() for s in pending):
+        adb.build_history_parse()  # construit une fois, avant que les processus ne se le disputent
+
+    start = time.perf_counter()
+    total = len(pending)
+    crashes = {}
+    suspects = []
+    failed = []
+    processed = 0
+
+    def report(session, record):
+        nonlocal processed
+        append_manifest(manifest_path, record)
+        processed += 1
+        if record["status"] != "done":
+            failed.append(session)
+        print(f"[PowDroid] [{processed}/{total}] {session.relative_to(root)}: {record['status']}"
+              + (f" in {record['seconds']:.2f}s" if "seconds" in record else "")
+              + (f" ({record['error']})" if "error" in record else ""))
+
+    while pending or suspects:
+        # Les sessions suspectes d'un crash sont rejouées seules : un nouveau crash ne peut venir que d'elles
+        alone = not pending
+        sessions = [suspects.pop(0)] if alone else pending
+        started = multiprocessing.SimpleQueue()
+        unfinished = set()
+        with ProcessPoolExecutor(
+            max_workers=1 if alone else workers or min(len(sessions), os.cpu_count() or 1),
+            initializer=init_worker,
+            initargs=(memory_cap, started)
+        ) as pool:
+            futures = {
+                pool.submit(run_session, task, str(session), list(output_formats), parser, cache_size, memory_budget, windows): session
+                for session in sessions
+            }
+            for future in as_completed(futures):
+                session = futures[future]
+                try:
+                    record = future.result()
+                except BrokenProcessPool:
+                    unfinished.add(session)  # processus tué (mémoire, signal) : pas forcément celui de cette session
+                    continue
+                except MemoryError:
+                    record = {"session": str(session), "status": "failed", "error": "memory cap exceeded"}
+                except Exception as e:
+                    # Une session en échec (dump corrompu, résultat non transmissible...) n'arrête pas le batch
+                    record = {"session": str(session), "status": "failed", "error": f"{type(e).__name__}: {e}"}
+                report(session, record)
+
+        launched = set()
+        while not started.empty():
+            launched.add(Path(started.get()))
+        crashed = [session for session in sessions if session in unfinished and session in launched] or sorted(unfinished)
+        # Les sessions jamais lancées repartent dans un nouveau pool, sans compter de crash
+        pending = [session for session in sessions if session in unfinished and session not in crashed]
+        for session in crashed:
+            if not alone:
+                suspects.append(session)
+                continue
+            crashes[session] = crashes.get(session, 0) + 1
+            if crashes[session] < WORKER_ATTEMPTS:
+                suspects.append(session)
+            else:
+                report(session, {"session": str(session), "status": "failed", "error": "worker process crashed"})
+    print(f"[PowDroid] Batch finished in {time.perf_counter() - start:.1f}s, {len(failed)} sessions failed. Manifest: {manifest_path}")
+    return failed
+
+def main(output_formats, verbose, cache=False, memory_budget=None, timings=False, parser="go", capture="full", stream=False, multi_device=False, workers=None, live_address=None, live_interval=live.LIVE_INTERVAL, cache_size=0, windows=None, replay_dir=None, replay_start=None, replay_stop=None, batch_root=None, worker_memory=None):
+    if batch_root:
+        return batch(batch_root, output_formats, workers, worker_memory, parser, cache_size, memory_budget, windows)
+    if replay_dir:
+        return replay(replay_dir, replay_start, replay_stop, output_formats, verbose, parser, cache_size, windows, timings, memory_budget=memory_budget)
 
-def main(output_formats, verbose):
     print(r"  ____               ____            _     _ ")
     print(r" |  _ \ _____      _|  _ \ _ __ ___ (_) __| |")
     print(r" | |_) / _ \ \ /\ / / | | | '__/ _ \| |/ _` |")
@@ -92,9 +436,26 @@ def main(output_formats, verbose):
     print(r" |_|   \___/ \_/\_/ |____/|_|  \___/|_|\__,_|")
     print("\n[PowDroid] Welcome to PowDroid CLI!\n")
 
-    initialize_connection(verbose)
-    start_user_session, stop_user_session = record_session(verbose)
-    file_name = process_batterystats(verbose)
-    generate_outputs(file_name, start_user_session, stop_user_session, output_formats, verbose)
+    if multi_device:
+        devices = initialize_devices(verbose, workers)
+        start_user_session, stop_user_session = record_session(verbose)
+        process_devices(
+            devices, workers, start_user_session, stop_user_session, output_formats,
+            verbose, cache, memory_budget, timings, parser, capture, stream, cache_size, windows
+        )
+    elif live_address:
+        usb_device = initialize_connection(verbose)
+        device = adb.connect_tcp(usb_device, live_address, verbose)
+        collector = live.LiveCollector(device, live_interval, verbose=verbose)
+        start_user_session, stop_user_session = record_session(verbose, collector, usb_device)
+        write_session_window(adb.DUMP_DIR, start_user_session, stop_user_session)
+        tables = finish_live_session(collector, verbose, timings)
+        generate_outputs(None, start_user_session, stop_user_session, output_formats, verbose, cache, memory_budget, tables, timings=timings, windows=windows)
+    else:
+        initialize_connection(verbose)
+        start_user_session, stop_user_session = record_session(verbose)
+        write_session_window(adb.DUMP_DIR, start_user_session, stop_user_session)
+        file_name, tables = process_batterystats(verbose, timings, parser, capture, stream)
+        generate_outputs(file_name, start_user_session, stop_user_session, output_formats, verbose, cache, memory_budget, tables, cache_size=cache_size, timings=timings, windows=windows)
 
     print("\n[PowDroid] All tasks completed successfully. Thank you for using PowDroid!")
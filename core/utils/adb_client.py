@@ -0,0 +1,178 @@
+import os
+import shlex
+import socket
+import threading
+
+ADB_HOST = os.environ.get("ANDROID_ADB_SERVER_ADDRESS", "127.0.0.1")
+ADB_PORT = int(os.environ.get("ANDROID_ADB_SERVER_PORT", 5037))
+CHUNK_SIZE = 64 * 1024
+POOL_SIZE = 2
+
+class AdbError(Exception):
+    pass
+
+class ConnectionClosed(AdbError):
+    pass
+
+def connect(host=None, port=None, timeout=None):
+    return socket.create_connection((host or ADB_HOST, port or ADB_PORT), timeout=timeout)
+
+def read_exactly(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionClosed("Connection closed by the adb server")
+        data += chunk
+    return bytes(data)
+
+def read_message(sock):
+    length = int(read_exactly(sock, 4), 16)
+    return read_exactly(sock, length)
+
+def read_status(sock):
+    status = read_exactly(sock, 4)
+    if status == b"OKAY":
+        return
+    if status == b"FAIL":
+        raise AdbError(read_message(sock).decode("utf-8", errors="replace"))
+    raise AdbError(f"Unexpected adb server status: {status!r}")
+
+def send_request(sock, request):
+    # Protocole hôte : la longueur en 4 chiffres hexadécimaux, puis la requête
+    payload = request.encode("utf-8")
+    sock.sendall(f"{len(payload):04x}".encode("ascii") + payload)
+    read_status(sock)
+
+def parse_devices(message):
+    devices = {}
+    for line in message.decode("utf-8", errors="replace").splitlines():
+        fields = line.split()
+        if len(fields) >= 2:
+            devices[fields[0]] = fields[1]
+    return devices
+
+def open_track_devices(host=None, port=None):
+    sock = connect(host, port)
+    try:
+        send_request(sock, "host:track-devices")
+    except Exception:
+        sock.close()
+        raise
+    return sock
+
+def track_devices(host=None, port=None):
+    # Le serveur adb envoie la liste complète des périphériques, puis à nouveau à chaque changement
+    sock = open_track_devices(host, port)
+    try:
+        while True:
+            yield parse_devices(read_message(sock))
+    finally:
+        sock.close()
+
+def iter_lines(chunks):
+    pending = b""
+    for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line + b"\n"
+    if pending:
+        yield pending
+
+def command_line(args):
+    return " ".join(shlex.quote(str(arg)) for arg in args)
+
+class AdbClient:
+    # Le serveur adb ferme une connexion une fois son service terminé : le client garde quelques
+    # connexions ouvertes d'avance plutôt que d'en réutiliser une seule
+    def __init__(self, host=None, port=None, pool_size=POOL_SIZE):
+        self.host = host
+        self.port = port
+        self.pool_size = pool_size
+        self.idle = []
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            if self.idle:
+                return self.idle.pop(), True
+        return connect(self.host, self.port), False
+
+    def warm_up(self):
+        with self.lock:
+            missing = self.pool_size - len(self.idle)
+        for _ in range(missing):
+            sock = connect(self.host, self.port)
+            with self.lock:
+                self.idle.append(sock)
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for sock in idle:
+            sock.close()
+
+    def request(self, request):
+        sock, pooled = self.acquire()
+        try:
+            send_request(sock, request)
+            return sock
+        except (OSError, ConnectionClosed):
+            sock.close()
+            # Une connexion du pool a pu être fermée par le serveur entre-temps : nouvel essai sur une neuve
+            if not pooled:
+                raise
+        except Exception:
+            sock.close()
+            raise
+        sock = connect(self.host, self.port)
+        try:
+            send_request(sock, request)
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    def host_query(self, request):
+        sock = self.request(request)
+        try:
+            return read_message(sock)
+        finally:
+            sock.close()
+
+    def devices(self):
+        return parse_devices(self.host_query("host:devices"))
+
+    def open_service(self, serial, service):
+        sock = self.request(f"host:transport:{serial}" if serial else "host:transport-any")
+        try:
+            send_request(sock, service)
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    def stream(self, serial, service):
+        # Le service est ouvert tout de suite : les erreurs de connexion sont levées ici et non à la lecture
+        return self.read_stream(self.open_service(serial, service))
+
+    def read_stream(self, sock):
+        try:
+            while True:
+                chunk = sock.recv(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            sock.close()
+            try:
+                self.warm_up()
+            except OSError:
+                pass
+
+    def shell(self, serial, *args):
+        return b"".join(self.stream(serial, f"shell:{command_line(args)}"))
+
+    def exec_out(self, serial, *args):
+        return self.stream(serial, f"exec:{command_line(args)}")
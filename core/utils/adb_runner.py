@@ -1,63 +1,204 @@
 import os
+import hashlib
+import socket
 import subprocess
 import sys
 import threading
 import time
 import itertools
 from pathlib import Path
+from contextlib import closing
+from . import adb_client
+from . import history_parser
 
 DUMP_DIR = Path(os.getcwd()) / "dump"
 GO_DIR = Path(__file__).resolve().parent / "../libs/battery-historian"
+GO_BIN_DIR = GO_DIR / "bin"
+HISTORY_PARSE_SRC = "cmd/history-parse/local_history_parse.go"
+STREAM_CHUNK_SIZE = 64 * 1024
+TCP_PORT = 5555
+UTC_OFFSET_FILE = "utc_offset.txt"  # décalage UTC du téléphone, à côté du dump
+WATCH_INTERVAL = 0.5  # s entre deux vérifications de l'annulation d'une attente du DeviceWatcher
+build_lock = threading.Lock()
+client = adb_client.AdbClient()
 
-def get_connected_device():
+def device_dir_name(device):
+    # Les numéros de série TCP ("192.168.1.5:5555") contiennent ":", interdit dans un nom de dossier sous Windows
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in device)
+
+def adb_command(device, *args):
+    return ["adb", *(["-s", device] if device else []), *args]
+
+def process_stream(command, verbose=False):
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=None if verbose else subprocess.DEVNULL)
+    try:
+        for chunk in iter(lambda: process.stdout.read(STREAM_CHUNK_SIZE), b""):
+            yield chunk
+    finally:
+        process.stdout.close()
+        if process.wait():
+            raise subprocess.CalledProcessError(process.returncode, command)
+
+def adb_stream(device, service, *args, verbose=False):
+    # service "exec" (binaire, comme exec-out) ou "shell", via le serveur adb sans lancer de processus
+    try:
+        return client.stream(device, f"{service}:{adb_client.command_line(args)}")
+    except OSError:
+        command = adb_command(device, "exec-out" if service == "exec" else "shell", *args)
+        return process_stream(command, verbose)
+
+def run_shell(device, verbose, *args):
+    output = b"".join(adb_stream(device, "shell", *args, verbose=verbose))
+    if verbose and output:
+        sys.stdout.write(output.decode("utf-8", errors="replace"))
+        sys.stdout.flush()
+
+def get_connected_devices():
+    try:
+        devices = client.devices()
+        return [serial for serial, state in devices.items() if state == "device"]
+    except (OSError, adb_client.AdbError):
+        pass
     try:
         output = subprocess.check_output(["adb", "devices"], text=True)
-        devices = [
+        return [
             line.split()[0]
             for line in output.splitlines()[1:]
             if line.strip() and line.strip().endswith("device")
         ]
-        return devices[0] if devices else None
     except subprocess.CalledProcessError as e:
         print(f"Error getting connected device: {e}")
-        return None
+        return []
+
+def get_connected_device():
+    devices = get_connected_devices()
+    return devices[0] if devices else None
+
+def online_devices_updates():
+    try:
+        for devices in adb_client.track_devices():
+            yield [serial for serial, state in devices.items() if state == "device"]
+    except (OSError, adb_client.AdbError):
+        # Serveur adb injoignable : on revient à l'interrogation de "adb devices"
+        while True:
+            yield get_connected_devices()
+            time.sleep(1)
 
 def wait_for_device_connection(verbose):
     print("[PowDroid] Waiting for device connection...")
-    while True:
-        device = get_connected_device()
-        if device:
-            print(f"[PowDroid] Device {device} connected." if verbose else "[PowDroid] Device connected.")
-            break
-        else:
-            time.sleep(1)
+    with closing(online_devices_updates()) as updates:
+        for devices in updates:
+            if devices:
+                print(f"[PowDroid] Device {devices[0]} connected." if verbose else "[PowDroid] Device connected.")
+                break
+
+def wait_for_devices_connection(devices, verbose):
+    print(f"[PowDroid] Waiting for {len(devices)} devices connection...")
+    with closing(online_devices_updates()) as updates:
+        for online in updates:
+            if set(devices) <= set(online):
+                break
+    print(f"[PowDroid] Devices {', '.join(devices)} connected." if verbose else "[PowDroid] Devices connected.")
 
-def kill_all():
+def kill_all(device=None):
     try:
-        subprocess.run(["adb", "shell", "am", "kill-all"], check=True)
-    except subprocess.CalledProcessError as e:
+        run_shell(device, True, "am", "kill-all")
+    except (subprocess.CalledProcessError, adb_client.AdbError) as e:
         print(f"Error killing adb server: {e}")
 
-def clear_batterystats(verbose):
+def clear_batterystats(verbose, device=None):
     try:
-        subprocess.run(
-            ["adb", "shell", "dumpsys", "batterystats", "--reset"],
-            check=True,
-            **({} if verbose else {"stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL})
-        )
-    except subprocess.CalledProcessError as e:
+        run_shell(device, verbose, "dumpsys", "batterystats", "--reset")
+    except (subprocess.CalledProcessError, adb_client.AdbError) as e:
         print(f"Error clearing battery stats: {e}")
 
-def wait_for_device_disconnection(verbose):
+def wait_for_device_disconnection(verbose, device=None):
+    # Avec device, seul ce périphérique doit partir (le téléphone reste connecté en TCP)
     print("[PowDroid] Waiting for device disconnection...")
-    last_device = get_connected_device()
-    while True:
-        device = get_connected_device()
-        if not device:
-            print(f"[PowDroid] Device {last_device} disconnected." if verbose else "[PowDroid] Device disconnected.")
-            break
-        else:
-            time.sleep(1)
+    last_device = device or get_connected_device()
+    with closing(online_devices_updates()) as updates:
+        for devices in updates:
+            if (device not in devices) if device else not devices:
+                print(f"[PowDroid] Device {last_device} disconnected." if verbose else "[PowDroid] Device disconnected.")
+                break
+            last_device = device or devices[0]
+
+def connect_tcp(device, address, verbose):
+    # Passe le téléphone branché en USB en adb over TCP, puis s'y connecte à l'adresse donnée
+    host, _, port = address.partition(":")
+    port = port or str(TCP_PORT)
+    try:
+        b"".join(client.stream(device, f"tcpip:{port}"))
+        time.sleep(1)  # adbd redémarre en mode TCP
+        message = client.host_query(f"host:connect:{host}:{port}").decode("utf-8", errors="replace")
+    except OSError:
+        opts = {} if verbose else {"stderr": subprocess.DEVNULL}
+        subprocess.run(adb_command(device, "tcpip", port), check=True, stdout=subprocess.DEVNULL, **opts)
+        time.sleep(1)
+        message = subprocess.check_output(["adb", "connect", f"{host}:{port}"], text=True, **opts)
+    if "connected to" not in message:
+        raise adb_client.AdbError(message.strip())
+    if verbose:
+        print(f"[PowDroid] {message.strip()}")
+    return f"{host}:{port}"
+
+class DeviceWatcher(threading.Thread):
+    # Envoie les événements ("connected" | "disconnected" | "error", numéro de série ou message) à on_event
+    def __init__(self, on_event):
+        super().__init__(daemon=True)
+        self.on_event = on_event
+        self.devices = set()
+        self.sock = None
+        self.stopped = threading.Event()
+        self.changed = threading.Condition()
+        self.ready = False  # première liste reçue
+        self.tracking = True
+
+    def run(self):
+        try:
+            self.sock = adb_client.open_track_devices()
+            while not self.stopped.is_set():
+                devices = adb_client.parse_devices(adb_client.read_message(self.sock))
+                online = {serial for serial, state in devices.items() if state == "device"}
+                for serial in sorted(online - self.devices):
+                    self.on_event("connected", serial)
+                for serial in sorted(self.devices - online):
+                    self.on_event("disconnected", serial)
+                with self.changed:
+                    self.devices = online
+                    self.ready = True
+                    self.changed.notify_all()
+        except (OSError, adb_client.AdbError) as e:
+            if not self.stopped.is_set():
+                self.on_event("error", str(e))
+        finally:
+            if self.sock:
+                self.sock.close()
+            with self.changed:
+                self.tracking = False
+                self.changed.notify_all()
+
+    def wait_for(self, condition, cancel=None):
+        # Rappelle condition(périphériques en ligne) à chaque liste reçue jusqu'à une valeur vraie ;
+        # renvoie None si le suivi s'arrête (serveur adb injoignable)
+        with self.changed:
+            while self.tracking:
+                if self.ready:
+                    value = condition(self.devices)
+                    if value:
+                        return value
+                self.changed.wait(WATCH_INTERVAL)
+                if cancel and cancel.is_set():
+                    raise CaptureCancelled()
+        return None
+
+    def stop(self):
+        self.stopped.set()
+        if self.sock:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
 
 def _spinner(stop_event):
     spinner = itertools.cycle(['/', '-', '\\', '|'])
@@ -68,9 +209,68 @@ def _spinner(stop_event):
     sys.stdout.write('\r[PowDroid] Extract battery data... done!\n')
     sys.stdout.flush()
 
-def dump_batterystats(verbose):
-    device = get_connected_device()
-    dump_dir = DUMP_DIR.resolve()
+def history_args(history_start=0):
+    return ["dumpsys", "batterystats", "-c", "--history-start", str(history_start)]
+
+def stream_batterystats_history(device, history_start=0, tee_path=None):
+    chunks = adb_stream(device, "exec", *history_args(history_start))
+    tee = open(tee_path, "wb") if tee_path else None
+    try:
+        for line in adb_client.iter_lines(chunks):
+            if tee:
+                tee.write(line)
+            yield line.decode("utf-8", errors="replace")
+    finally:
+        if tee:
+            tee.close()
+        chunks.close()
+
+class CaptureCancelled(Exception):
+    pass
+
+def stream_to_file(chunks, path, mode="wb", cancel=None):
+    transferred = 0
+    with open(path, mode) as f:
+        for chunk in chunks:
+            if cancel and cancel.is_set():
+                chunks.close()
+                raise CaptureCancelled()
+            f.write(chunk)
+            transferred += len(chunk)
+    return transferred
+
+def run_cancellable(command, cancel=None, **opts):
+    # subprocess.run(check=True), interrompu (terminate) dès que cancel est positionné
+    if cancel is None:
+        return subprocess.run(command, check=True, **opts)
+    process = subprocess.Popen(command, **opts)
+    while process.poll() is None:
+        if cancel.wait(0.2):
+            process.terminate()
+            process.wait()
+            raise CaptureCancelled()
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, command)
+
+def save_utc_offset(device, dump_dir, verbose=False):
+    # L'historique lisible date ses RESET:TIME: dans l'heure locale du téléphone, pas dans celle de l'ordinateur
+    try:
+        output = b"".join(adb_stream(device, "shell", "date", "+%z", verbose=verbose)).decode("utf-8", errors="replace")
+    except (OSError, subprocess.CalledProcessError, adb_client.AdbError) as e:
+        print(f"[Debug] Could not read the UTC offset of {device}: {e}")
+        return None
+    (dump_dir / UTC_OFFSET_FILE).write_text(output.strip() + "\n", encoding="utf-8")
+    return history_parser.parse_utc_offset(output)
+
+def read_utc_offset(dump_dir):
+    path = Path(dump_dir) / UTC_OFFSET_FILE
+    if not path.exists():
+        return None
+    return history_parser.parse_utc_offset(path.read_text(encoding="utf-8"))
+
+def dump_batterystats(verbose, capture="full", timings=False, device=None, dump_dir=None, spinner=True, cancel=None):
+    device = device or get_connected_device()
+    dump_dir = Path(dump_dir or DUMP_DIR).resolve()
     dump_dir.mkdir(parents=True, exist_ok=True)
     batterystats_path = dump_dir / "batterystats.txt"
     bugreport_path = dump_dir / "battery_device.zip"
@@ -78,36 +278,121 @@ def dump_batterystats(verbose):
 
     spinner_stop = threading.Event()
     spinner_thread = None
-    if not verbose:
+    spinner = spinner and not verbose
+    if spinner:
         spinner_thread = threading.Thread(target=_spinner, args=(spinner_stop,))
         spinner_thread.start()
 
+    start = time.perf_counter()
     try:
-        subprocess.run(
-            f"adb -s {device} shell dumpsys batterystats --enable full-wake-history > \"{batterystats_path}\"",
-            shell=True, check=True, **opts
-        )
-        subprocess.run(
-            f"adb -s {device} shell dumpsys batterystats >> \"{batterystats_path}\"",
-            shell=True, check=True, **opts
-        )
-        subprocess.run(
-            f"adb -s {device} bugreport \"{bugreport_path}\"",
-            shell=True, check=True, **opts
-        )
+        if capture == "lite":
+            # Seul l'historique de batterystats est utile : pas de bugreport
+            transferred = stream_to_file(adb_stream(device, "exec", *history_args(), verbose=verbose), batterystats_path, cancel=cancel)
+        else:
+            transferred = stream_to_file(
+                adb_stream(device, "exec", "dumpsys", "batterystats", "--enable", "full-wake-history", verbose=verbose),
+                batterystats_path, cancel=cancel
+            )
+            transferred += stream_to_file(
+                adb_stream(device, "exec", "dumpsys", "batterystats", verbose=verbose),
+                batterystats_path, mode="ab", cancel=cancel
+            )
+            save_utc_offset(device, dump_dir, verbose)
+            run_cancellable(adb_command(device, "bugreport", str(bugreport_path)), cancel, **opts)
+            transferred += bugreport_path.stat().st_size
     finally:
-        if not verbose:
+        if spinner:
             spinner_stop.set()
             spinner_thread.join()
 
-def conversion_batterystats():
-    file_name = "battery_device.csv"
-    csv_path = str((DUMP_DIR / file_name).resolve())
-    zip_path = str((DUMP_DIR / 'battery_device.zip').resolve())
-    log_path = str((DUMP_DIR / 'history_parse_log.txt').resolve())
-    command = (
-        f'go run cmd/history-parse/local_history_parse.go --summary=totalTime '
-        f'--csv="{csv_path}" --input="{zip_path}" > "{log_path}" 2>&1'
+    if timings:
+        elapsed = time.perf_counter() - start
+        print(f"[PowDroid] Capture ({capture}) of {device} transferred {transferred / (1024 * 1024):.2f} MB in {elapsed:.2f}s")
+    return transferred
+
+def dump_batterystats_streaming(verbose, timings=False, device=None, dump_dir=None, spinner=True):
+    # Capture lite uniquement : le CSV vient de l'historique analysé en direct, un bugreport ne servirait pas
+    device = device or get_connected_device()
+    dump_dir = Path(dump_dir or DUMP_DIR).resolve()
+    dump_dir.mkdir(parents=True, exist_ok=True)
+    batterystats_path = dump_dir / "batterystats.txt"
+
+    spinner_stop = threading.Event()
+    spinner_thread = None
+    spinner = spinner and not verbose
+    if spinner:
+        spinner_thread = threading.Thread(target=_spinner, args=(spinner_stop,))
+        spinner_thread.start()
+
+    start = time.perf_counter()
+    try:
+        yield from stream_batterystats_history(device, tee_path=batterystats_path)
+    finally:
+        if spinner:
+            spinner_stop.set()
+            spinner_thread.join()
+
+    if timings:
+        transferred = batterystats_path.stat().st_size
+        elapsed = time.perf_counter() - start
+        print(f"[PowDroid] Capture (lite, streamed) of {device} transferred {transferred / (1024 * 1024):.2f} MB in {elapsed:.2f}s")
+
+def go_sources_hash():
+    digest = hashlib.sha256()
+    go_dir = GO_DIR.resolve()
+    for path in sorted(go_dir.rglob("*")):
+        if GO_BIN_DIR.resolve() in path.parents or not path.is_file():
+            continue
+        if path.suffix == ".go" or path.name in ("go.mod", "go.sum"):
+            digest.update(path.relative_to(go_dir).as_posix().encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+def build_history_parse(verbose=False):
+    with build_lock:
+        return _build_history_parse(verbose)
+
+def _build_history_parse(verbose):
+    bin_dir = GO_BIN_DIR.resolve()
+    suffix = ".exe" if os.name == "nt" else ""
+    binary = bin_dir / f"history-parse-{go_sources_hash()}{suffix}"
+    if binary.exists():
+        return binary
+
+    print("[PowDroid] Building the Battery Historian parser (only needed once)...")
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    for stale in bin_dir.glob("history-parse-*"):
+        stale.unlink()
+    subprocess.run(
+        ["go", "build", "-o", str(binary), HISTORY_PARSE_SRC],
+        check=True, cwd=GO_DIR,
+        **({} if verbose else {"stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL})
     )
-    subprocess.run(command, shell=True, check=True, cwd=GO_DIR)
+    return binary
+
+def conversion_batterystats(verbose=False, timings=False, parser="go", dump_dir=None, cancel=None):
+    dump_dir = Path(dump_dir or DUMP_DIR)
+    file_name = "battery_device.csv" if dump_dir == DUMP_DIR else str((dump_dir / "battery_device.csv").resolve())
+    csv_path = str((dump_dir / "battery_device.csv").resolve())
+    zip_path = str((dump_dir / 'battery_device.zip').resolve())
+    log_path = str((dump_dir / 'history_parse_log.txt').resolve())
+
+    start = time.perf_counter()
+    if parser == "python":
+        history_parser.convert(dump_dir / "batterystats.txt", csv_path, read_utc_offset(dump_dir))
+        if timings:
+            print(f"[PowDroid] Conversion took {time.perf_counter() - start:.2f}s (Python history parser)")
+        return file_name
+
+    binary = build_history_parse(verbose)
+    built = time.perf_counter()
+    with open(log_path, "w") as log:
+        run_cancellable(
+            [str(binary), "--summary=totalTime", f"--csv={csv_path}", f"--input={zip_path}"],
+            cancel, cwd=GO_DIR, stdout=log, stderr=subprocess.STDOUT
+        )
+    end = time.perf_counter()
+
+    if timings:
+        print(f"[PowDroid] Conversion took {end - start:.2f}s (parser build {built - start:.2f}s, parsing {end - built:.2f}s)")
     return file_name
@@ -0,0 +1,91 @@
+import queue
+import threading
+import time
+
+POLL_INTERVAL = 100  # ms entre deux lectures de la file des événements par la boucle Tk
+WAIT_INTERVAL = 0.5  # s entre deux vérifications d'une attente annulable
+
+class JobCancelled(Exception):
+    pass
+
+class BackgroundJob(threading.Thread):
+    # Exécute les étapes (nom, fonction(job)) hors de la boucle Tk. L'avancement revient par une file
+    # que la boucle Tk relit avec app.after : les callbacks sont toujours appelés sur le thread Tk.
+    #   on_progress(stage, index, count, message), on_done(results), on_error(exception), on_cancel()
+    def __init__(self, app, stages, on_progress=None, on_done=None, on_error=None, on_cancel=None):
+        super().__init__(daemon=True)
+        self.app = app
+        self.stages = stages
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_cancel = on_cancel
+        self.events = queue.Queue()
+        self.cancelled = threading.Event()
+        self.results = {}
+        self.timings = {}
+        self.stage = None
+        self.index = 0
+
+    def start(self):
+        super().start()
+        self.app.after(POLL_INTERVAL, self.poll)
+
+    def run(self):
+        try:
+            for self.index, (self.stage, function) in enumerate(self.stages):
+                self.check()
+                self.progress(None)
+                start = time.perf_counter()
+                self.results[self.stage] = function(self)
+                self.timings[self.stage] = time.perf_counter() - start
+            self.check()
+            self.events.put(("done", None))
+        except Exception as e:
+            if self.cancelled.is_set():
+                self.events.put(("cancelled", None))
+            else:
+                print(f"[Debug] Error in BackgroundJob.run() at line {e.__traceback__.tb_lineno}: {e}")
+                self.events.put(("error", e))
+
+    def progress(self, message):
+        self.events.put(("progress", (self.stage, self.index, len(self.stages), message)))
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def check(self):
+        if self.cancelled.is_set():
+            raise JobCancelled()
+
+    def wait_until(self, condition, interval=WAIT_INTERVAL):
+        # Attente annulable : condition() est rappelée jusqu'à renvoyer une valeur vraie
+        while True:
+            value = condition()
+            if value:
+                return value
+            if self.cancelled.wait(interval):
+                raise JobCancelled()
+
+    def format_timings(self):
+        return ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in self.timings.items())
+
+    def poll(self):
+        while True:
+            try:
+                kind, value = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                if self.on_progress:
+                    self.on_progress(*value)
+                continue
+            # Fin du job : la file n'est plus relue
+            if kind == "done" and self.on_done:
+                self.on_done(self.results)
+            elif kind == "error" and self.on_error:
+                self.on_error(value)
+            elif kind == "cancelled" and self.on_cancel:
+                self.on_cancel()
+            return
+        self.app.after(POLL_INTERVAL, self.poll)
@@ -0,0 +1,72 @@
+from . import csv_handler as csv
+
+# Formats colonnes (pyarrow, optionnel) : extension de fichier de chaque format
+COLUMNAR_FORMATS = {"parquet": "parquet", "feather": "feather", "arrow": "arrow"}
+INT_COLUMNS = ["start_time", "end_time", "Duration (mS)"]
+FLOAT_COLUMNS = [
+    "Voltage (mV)", "Remaining_charge (mAh)", "Intensity (mA)", "Power (W)",
+    "Consumed charge(mAh)", "Energy (J)"
+]
+DICTIONARY_COLUMNS = ["Top app", "Wakelock_in (Service)"]
+
+def is_available():
+    try:
+        import pyarrow
+        return True
+    except ImportError:
+        return False
+
+def schema():
+    import pyarrow as pa
+
+    types = {column: pa.int64() for column in INT_COLUMNS}
+    types.update({column: pa.float64() for column in FLOAT_COLUMNS})
+    types.update({column: pa.dictionary(pa.int32(), pa.string()) for column in DICTIONARY_COLUMNS})
+    types.update({column: pa.bool_() for column in csv.BOOL_COLUMNS})
+    return pa.schema([pa.field(column, types[column]) for column in csv.COLUMNS])
+
+def arrow_table(df):
+    import pyarrow as pa
+
+    # Les colonnes numériques sont converties ici : l'absence de valeur devient null
+    return pa.Table.from_pandas(df.astype({column: float for column in FLOAT_COLUMNS}), schema=schema(), preserve_index=False)
+
+def write_table(table, path, output_format):
+    import pyarrow.feather as feather
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as parquet
+
+    if output_format == "parquet":
+        parquet.write_table(table, path)
+    elif output_format == "feather":
+        feather.write_feather(table, path)  # Feather v2 compressé (lz4)
+    elif output_format == "arrow":
+        with ipc.new_file(path, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        raise ValueError(f"Unknown columnar format: {output_format}")
+    return path
+
+def write_outputs(df, stem, output_formats):
+    # Une seule conversion Arrow, partagée par tous les formats demandés
+    try:
+        table = None
+        paths = {}
+        for output_format in output_formats:
+            if output_format not in COLUMNAR_FORMATS:
+                continue
+            if table is None:
+                table = arrow_table(df)
+            paths[output_format] = write_table(table, f"{stem}.{COLUMNAR_FORMATS[output_format]}", output_format)
+        return paths
+    except Exception as e:
+        print(f"[Debug] Error in write_outputs() at line {e.__traceback__.tb_lineno}: {e}")
+        raise
+
+def read_table(path):
+    import pyarrow.feather as feather
+    import pyarrow.parquet as parquet
+
+    if str(path).endswith(".parquet"):
+        return parquet.read_table(path).to_pandas()
+    return feather.read_feather(path)  # Feather v2 et fichier Arrow IPC ont le même format
@@ -1,156 +1,402 @@
 import os
+import numpy
 import pandas
-import glob
 from datetime import datetime
 from pathlib import Path
+from . import history_parser
 
 DUMP_DIR = Path(os.getcwd()) / "dump"
 TMP_DIR = Path(os.getcwd()) / "tmp"
 OUTPUT_DIR = Path(os.getcwd())
 
-def generate_files(file):
+METRICS = ["Voltage", "Screen", "GPS", "Camera", "Audio", "Mobile radio active", "Coulomb charge", "Top app", "Wifi on", "Wifi radio", "Video", "Wakelock_in"]
+COLUMNS = [
+    "start_time", "end_time", "Duration (mS)", "Voltage (mV)", "Remaining_charge (mAh)",
+    "Intensity (mA)", "Power (W)", "Consumed charge(mAh)", "Energy (J)", "Top app", "Screen(ON/OFF)",
+    "GPS(ON/OFF)", "Mobile_Radio(ON/OFF)", "WiFi(ON/OFF)", "Wifi radio", "Camera(ON/OFF)",
+    "Video (ON/OFF)", "Audio(ON/OFF)", "Wakelock_in (Service)"
+]
+USED_COLUMNS = ["metric", "start_time", "end_time", "value"]
+ROWS_PER_BATCH = 50000
+ROW_BYTES = 512  # taille approximative d'une ligne lue en mémoire (chaînes Python comprises)
+BOOL_COLUMNS = {
+    "Screen(ON/OFF)": "Screen",
+    "GPS(ON/OFF)": "GPS",
+    "Mobile_Radio(ON/OFF)": "Mobile radio active",
+    "WiFi(ON/OFF)": "Wifi on",
+    "Wifi radio": "Wifi radio",
+    "Camera(ON/OFF)": "Camera",
+    "Video (ON/OFF)": "Video",
+    "Audio(ON/OFF)": "Audio",
+}
+
+def typed_table(table):
+    table = table.reset_index(drop=True)
     try:
-        TMP_DIR.resolve()
-        TMP_DIR.mkdir(parents=True, exist_ok=True)
-        df = pandas.read_csv(os.path.join(DUMP_DIR, file))
-        Metrics = ["Voltage", "Screen", "GPS", "Camera", "Audio", "Mobile radio active", "Coulomb charge", "Top app", "Wifi on", "Wifi radio", "Video", "Wakelock_in"]
-        for metric in Metrics:
-            result = df[df["metric"] == metric]
-            result.to_csv(os.path.join(TMP_DIR, f'{metric}.csv'), index=False)
+        # Chaque métrique a son propre type de valeur (mV, mAh, nom d'app...)
+        table["value"] = pandas.to_numeric(table["value"])
+    except (ValueError, TypeError):
+        pass
+    return table
+
+def partition_metrics(df):
+    groups = dict(tuple(df[df["metric"].isin(METRICS)].groupby("metric", sort=False)))
+    return {metric: typed_table(groups.get(metric, df.iloc[0:0])) for metric in METRICS}
+
+def tables_from_rows(rows, batch_size=ROWS_PER_BATCH):
+    # Partitionne les lignes (metric, type, start_time, end_time, value, opt) au fil de l'eau
+    parts = {metric: [] for metric in METRICS}
+
+    def flush(batch):
+        df = pandas.DataFrame(batch, columns=history_parser.HEADER)
+        for metric, group in df.groupby("metric", sort=False):
+            parts[metric].append(group)
+
+    batch = []
+    for row in rows:
+        if row[0] in parts:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+    if batch:
+        flush(batch)
+
+    empty = pandas.DataFrame(columns=history_parser.HEADER)
+    return {metric: typed_table(pandas.concat(parts[metric]) if parts[metric] else empty) for metric in METRICS}
+
+def merge_tables(parts):
+    # Concatène, dans l'ordre de collecte, des tables déjà partitionnées (une par delta d'historique)
+    empty = pandas.DataFrame(columns=history_parser.HEADER)
+    merged = {}
+    for metric in METRICS:
+        tables = [part[metric] for part in parts if len(part[metric])]
+        merged[metric] = typed_table(pandas.concat(tables) if tables else empty)
+    return merged
+
+def window_rows(df, init_test_time=None, end_test_time=None, closed=None):
+    # Lignes utiles à la fenêtre : celles qui finissent après son début et commencent avant sa fin,
+    # plus la première ligne de chaque métrique après la fenêtre (sa valeur sert au calcul de l'intensité)
+    if init_test_time is not None:
+        df = df[df["end_time"] >= init_test_time]
+    if end_test_time is not None:
+        after = df["start_time"] > end_test_time
+        tail = df[after].drop_duplicates("metric")
+        if closed is not None:
+            # Lecture par morceaux : une métrique déjà close dans un morceau précédent ne l'est pas à nouveau
+            tail = tail[~tail["metric"].isin(closed)]
+            closed.update(tail["metric"])
+        df = pandas.concat([df[~after], tail])
+    return df
+
+def read_metrics_chunked(path, memory_budget, init_test_time=None, end_test_time=None):
+    # memory_budget borne le morceau lu, pas le résultat : les lignes de la fenêtre sont gardées en plus,
+    # typées (valeurs numériques plutôt que chaînes) dès leur morceau
+    chunksize = max(1000, int(memory_budget * 1024 * 1024) // ROW_BYTES)
+    parts = []
+    closed = set()
+    reader = pandas.read_csv(path, usecols=USED_COLUMNS, dtype={"metric": str, "value": str}, chunksize=chunksize)
+    for chunk in reader:
+        chunk = chunk[chunk["metric"].isin(METRICS)]
+        parts.append(partition_metrics(window_rows(chunk, init_test_time, end_test_time, closed).sort_index()))
+    return merge_tables(parts)
+
+def generate_files(file, cache=False, memory_budget=None, init_test_time=None, end_test_time=None):
+    try:
+        path = os.path.join(DUMP_DIR, file)
+        if memory_budget:
+            tables = read_metrics_chunked(path, memory_budget, init_test_time, end_test_time)
+        else:
+            df = pandas.read_csv(path)
+            tables = partition_metrics(window_rows(df[df["metric"].isin(METRICS)], init_test_time, end_test_time).sort_index())
+        if cache:
+            write_metric_tables(tables)
+        return tables
     except Exception as e:
         print(f"[Debug] Error in generate_files() at line {e.__traceback__.tb_lineno}: {e}")
         raise
 
-def union_time():
-    all_csv_files = glob.glob(str(TMP_DIR / "*.csv"))
-    ensembles_temps = set()
-    for file_name in all_csv_files:
-        df = pandas.read_csv(file_name)
-        for index, row in df.iterrows():
-            start_time = row['start_time']
-            end_time = row['end_time']
-            ensembles_temps.add(start_time)
-            ensembles_temps.add(end_time)
-
-    list_temp = list(ensembles_temps)
-    list_temp.sort()
-    return list_temp
-
-def look_up(file_name, start_time, end_time):
-    file_readed = pandas.read_csv(TMP_DIR / file_name)
-    found = file_readed[(start_time >= file_readed.start_time) & (end_time <= file_readed.end_time)]
-    if(len(found)==0):
-        metric_value = 0.0
-    else:
-        metric_value = found["value"].values
-    return metric_value
+def union_time(tables, init_test_time=None, end_test_time=None):
+    boundaries = numpy.concatenate([
+        table[column].to_numpy(dtype=numpy.int64)
+        for table in tables.values()
+        for column in ("start_time", "end_time")
+    ])
+    if init_test_time is not None:
+        boundaries = boundaries[boundaries >= init_test_time]
+    if end_test_time is not None:
+        boundaries = boundaries[boundaries <= end_test_time]
+    return numpy.unique(boundaries)
 
-def look_up_intensity(file_name, start_time, end_time):
-    file_readed = pandas.read_csv(TMP_DIR / file_name)
-    file_readed["next_value"] = file_readed["value"].shift(-1)
-    found = file_readed[(start_time >= file_readed.start_time) & (end_time <= file_readed.end_time)]
+def write_metric_tables(tables, tmp_dir=None):
+    tmp_dir = Path(tmp_dir or TMP_DIR)
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    for metric, table in tables.items():
+        table.to_csv(os.path.join(tmp_dir, f'{metric}.csv'), index=False)
 
-    if len(found) == 0:
-        amp = 0
-    else:
-        charge_consumed = found["value"] - found["next_value"]
-        duration_sec = (file_readed.end_time - file_readed.start_time) / 1000
+def load_metric_tables():
+    return {metric: pandas.read_csv(TMP_DIR / f"{metric}.csv") for metric in METRICS}
+
+def covered_intervals(table, time_intervals):
+    # Une ligne de métrique couvre les intervalles [t_k, t_k+1] tels que start_time <= t_k et t_k+1 <= end_time
+    n_intervals = len(time_intervals) - 1
+    first = numpy.searchsorted(time_intervals, table["start_time"].to_numpy(), side="left")
+    last = numpy.searchsorted(time_intervals, table["end_time"].to_numpy(), side="right") - 1
+    first = numpy.clip(first, 0, n_intervals)
+    last = numpy.clip(last, first, n_intervals)
+    return first, last
+
+def sweep_bool(first, last, n_intervals):
+    events = numpy.zeros(n_intervals + 1, dtype=numpy.int64)
+    numpy.add.at(events, first, 1)
+    numpy.add.at(events, last, -1)
+    return numpy.cumsum(events[:-1]) > 0
+
+def sweep_first(first, last, n_intervals):
+    # Indice de la première ligne (dans l'ordre du fichier) couvrant chaque intervalle, -1 si aucune
+    owner = numpy.full(n_intervals, -1, dtype=numpy.int64)
+    lengths = last - first
+    total = int(lengths.sum())
+    if total == 0:
+        return owner
+    rows = numpy.repeat(numpy.arange(len(first)), lengths)
+    offsets = numpy.repeat(numpy.cumsum(lengths) - lengths, lengths)
+    covered = numpy.arange(total) - offsets + numpy.repeat(first, lengths)
+    intervals, first_seen = numpy.unique(covered, return_index=True)
+    owner[intervals] = rows[first_seen]
+    return owner
+
+def lookup_owner(table, time_intervals):
+    first, last = covered_intervals(table, time_intervals)
+    return sweep_first(first, last, len(time_intervals) - 1)
+
+def lookup_intensity(table, time_intervals):
+    charge_consumed = table["value"] - table["value"].shift(-1)
+    duration_hr = (table["end_time"] - table["start_time"]) / 1000 / 3600
+    amp = (charge_consumed / duration_hr.replace(0, numpy.nan)).to_numpy(dtype=float)
+    valid = ~numpy.isnan(amp)
+    owner = lookup_owner(table[valid], time_intervals)
+    return numpy.where(owner >= 0, amp[valid][numpy.maximum(owner, 0)] if valid.any() else numpy.nan, numpy.nan)
+
+def lookup_bool(table, time_intervals):
+    first, last = covered_intervals(table, time_intervals)
+    return sweep_bool(first, last, len(time_intervals) - 1)
+
+class ValueColumn:
+    # Valeur d'une métrique par intervalle, encodée selon le type de la table source :
+    #   numérique -> data float32 (entiers exacts < 2**24) ou float64, NaN si aucune ligne ne couvre l'intervalle
+    #   texte     -> data = codes int8/16/32 dans categories, -1 si aucune ligne ne couvre l'intervalle
+    def __init__(self, values, owner):
+        found = owner >= 0
+        self.integer = numpy.issubdtype(values.dtype, numpy.integer)
+        if numpy.issubdtype(values.dtype, numpy.number):
+            self.categories = None
+            exact = self.integer and (not len(values) or numpy.abs(values).max() < 2 ** 24)
+            self.data = numpy.full(len(owner), numpy.nan, dtype=numpy.float32 if exact else numpy.float64)
+            self.data[found] = values[owner[found]]
+        else:
+            codes, self.categories = pandas.factorize(values)
+            self.categories = numpy.asarray(self.categories, dtype=object)
+            code_type = numpy.min_scalar_type(-max(len(self.categories), 1))
+            self.data = numpy.where(found, codes[numpy.maximum(owner, 0)] if len(codes) else -1, -1).astype(code_type)
+
+    def take(self, lo, hi):
+        column = ValueColumn.__new__(ValueColumn)
+        column.integer, column.categories, column.data = self.integer, self.categories, self.data[lo:hi]
+        return column
+
+    def found(self):
+        return ~numpy.isnan(self.data) if self.categories is None else self.data >= 0
+
+    def values(self):
+        # Même résultat que de chercher les valeurs sur la fenêtre : entiers tant qu'aucune ne manque
+        if self.categories is not None:
+            values = numpy.full(len(self.data), None, dtype=object)
+            found = self.data >= 0
+            values[found] = self.categories[self.data[found]]
+            return values
+        if self.integer and not numpy.isnan(self.data).any():
+            return self.data.astype(numpy.int64)
+        return self.data.astype(numpy.float64)
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + (self.categories.nbytes if self.categories is not None else 0)
+
+class IntervalTable:
+    # Table des intervalles en colonnes typées (une ligne par intervalle [t_k, t_k+1]) :
+    #   boundaries  int64[n + 1]   bornes consécutives, start_time = boundaries[:-1], end_time = boundaries[1:]
+    #   voltage     ValueColumn    mV de la première ligne "Voltage" couvrant l'intervalle
+    #   coulomb     ValueColumn    mAh restants ("Coulomb charge")
+    #   intensity   float64[n]     mA déduits de deux mesures de charge successives, NaN si inconnue
+    #   app         ValueColumn    "Top app", chaînes encodées en codes + catégories
+    #   wakelock    ValueColumn    "Wakelock_in", idem
+    #   states      uint16[n]      bit i à 1 si le composant BOOL_COLUMNS[i] est actif
+    # Durée, puissance, charge consommée et énergie ne sont pas stockées : to_frame() les recalcule.
+    # Une fenêtre est une tranche contiguë, trouvée par recherche dichotomique sur boundaries.
+    def __init__(self, boundaries, voltage, coulomb, intensity, app, wakelock, states):
+        self.boundaries = boundaries
+        self.voltage = voltage
+        self.coulomb = coulomb
+        self.intensity = intensity
+        self.app = app
+        self.wakelock = wakelock
+        self.states = states
+
+    @classmethod
+    def from_tables(cls, tables, time_intervals):
+        time_intervals = numpy.asarray(time_intervals, dtype=numpy.int64)
+        if not len(time_intervals):
+            time_intervals = numpy.zeros(1, dtype=numpy.int64)  # aucune donnée : zéro intervalle
+
+        def column(metric):
+            return ValueColumn(tables[metric]["value"].to_numpy(), lookup_owner(tables[metric], time_intervals))
+
+        states = numpy.zeros(len(time_intervals) - 1, dtype=numpy.uint16)
+        for bit, metric in enumerate(BOOL_COLUMNS.values()):
+            states |= lookup_bool(tables[metric], time_intervals).astype(numpy.uint16) << numpy.uint16(bit)
+        return cls(
+            time_intervals, column("Voltage"), column("Coulomb charge"),
+            lookup_intensity(tables["Coulomb charge"], time_intervals),
+            column("Top app"), column("Wakelock_in"), states
+        )
+
+    def __len__(self):
+        return len(self.boundaries) - 1
+
+    def window(self, init_test_time=None, end_test_time=None):
+        lo = 0 if init_test_time is None else int(numpy.searchsorted(self.boundaries, init_test_time, side="left"))
+        hi = len(self) if end_test_time is None else int(numpy.searchsorted(self.boundaries, end_test_time, side="right")) - 1
+        if hi <= lo:
+            lo = hi = min(lo, len(self))
+        return IntervalTable(
+            self.boundaries[lo:hi + 1],
+            self.voltage.take(lo, hi), self.coulomb.take(lo, hi), self.intensity[lo:hi],
+            self.app.take(lo, hi), self.wakelock.take(lo, hi), self.states[lo:hi]
+        )
+
+    def state(self, column):
+        bit = list(BOOL_COLUMNS).index(column)
+        return (self.states >> bit) & 1 == 1
+
+    @property
+    def nbytes(self):
+        return (self.boundaries.nbytes + self.intensity.nbytes + self.states.nbytes
+                + sum(c.nbytes for c in (self.voltage, self.coulomb, self.app, self.wakelock)))
+
+    def to_frame(self):
+        start_time, end_time = self.boundaries[:-1], self.boundaries[1:]
+        duration = end_time - start_time
+        voltage = self.voltage.values()
+        intensity = self.intensity
+
+        # Calculs directs pour les colonnes dérivées (une valeur absente ou nulle compte pour 0)
+        with numpy.errstate(invalid="ignore"):
+            has_voltage = self.voltage.found() & (voltage != 0)
+            has_intensity = ~numpy.isnan(intensity) & (intensity != 0)
+        duration_sec = duration / 1000
         duration_hr = duration_sec / 3600
-        duration_hr = duration_hr.replace(0, float('nan')) if hasattr(duration_hr, 'replace') else duration_hr
-        amp_value = charge_consumed / duration_hr
-        amp = amp_value.dropna()
-    return amp.values
-
-def look_up_bool(file_name, start_time, end_time):
-    file_readed = pandas.read_csv(TMP_DIR / file_name)
-    found = file_readed[(start_time >= file_readed.start_time) & (end_time <= file_readed.end_time)]
-    if(len(found)==0):
-        metric_value = False
-    else:
-        metric_value = True
-    return metric_value
+        convert_V = numpy.where(has_voltage, voltage.astype(float) / 1000, 0.0)
+        convert_A = numpy.where(has_intensity, intensity / 1000, 0.0)
+
+        power = convert_V * convert_A
+        consumed_charge = numpy.where(has_intensity, intensity * duration_hr, 0.0)
+        energy = power * duration_sec
+
+        data = {
+            "start_time": start_time,
+            "end_time": end_time,
+            "Duration (mS)": duration,
+            "Voltage (mV)": voltage,
+            "Remaining_charge (mAh)": self.coulomb.values(),
+            "Intensity (mA)": intensity,
+            "Power (W)": power,
+            "Consumed charge(mAh)": consumed_charge,
+            "Energy (J)": energy,
+            "Top app": self.app.values(),
+        }
+        for column in BOOL_COLUMNS:
+            data[column] = self.state(column)
+        data["Wakelock_in (Service)"] = self.wakelock.values()
+        return pandas.DataFrame(data, columns=COLUMNS)
+
+def join_intervals(tables, time_intervals):
+    return IntervalTable.from_tables(tables, time_intervals).to_frame()
+
+def session_intervals(tables):
+    # Table des intervalles de toute la session : une fenêtre en est une tranche contiguë
+    return IntervalTable.from_tables(tables, union_time(tables))
 
-def process_csv_file(init_test_time, end_test_time):
+def window_intervals(full, init_test_time=None, end_test_time=None):
+    return full.window(init_test_time, end_test_time).to_frame()
+
+def window_totals(window):
+    duration_ms = int(window["Duration (mS)"].sum()) if len(window) else 0
+    energy = float(window["Energy (J)"].sum())
+    return {
+        "Intervals": len(window),
+        "Duration (mS)": duration_ms,
+        "Consumed charge(mAh)": float(window["Consumed charge(mAh)"].sum()),
+        "Energy (J)": energy,
+        "Average power (W)": energy / (duration_ms / 1000) if duration_ms else 0.0,
+    }
+
+def file_label(label):
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in label)
+
+def process_windows(windows, tables=None, output_dir=None, intervals=None):
+    # La table des intervalles est calculée une fois, chaque fenêtre en est une tranche
     try:
-        metrics = [
-            "Voltage.csv", "Screen.csv", "GPS.csv", "Camera.csv", "Audio.csv",
-            "Mobile radio active.csv", "Coulomb charge.csv", "Top app.csv",
-            "Wifi on.csv", "Wifi radio.csv", "Video.csv", "Wakelock_in.csv"
-        ]
-        columns = [
-            "start_time", "end_time", "Duration (mS)", "Voltage (mV)", "Remaining_charge (mAh)",
-            "Intensity (mA)", "Power (W)", "Consumed charge(mAh)", "Energy (J)", "Top app", "Screen(ON/OFF)",
-            "GPS(ON/OFF)", "Mobile_Radio(ON/OFF)", "WiFi(ON/OFF)", "Wifi radio", "Camera(ON/OFF)",
-            "Video (ON/OFF)", "Audio(ON/OFF)", "Wakelock_in (Service)"
-        ]
-        rows = []
-
-        time_intervals = [t for t in union_time() if init_test_time <= t <= end_test_time]
-        n_intervals = len(time_intervals) - 1
+        if intervals is None:
+            intervals = session_intervals(tables if tables is not None else load_metric_tables())
+        output_dir = Path(output_dir or OUTPUT_DIR)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        timestamp = datetime.now().timestamp()
+
+        reports = []
+        summary = []
+        for label, init_test_time, end_test_time in windows:
+            window = window_intervals(intervals, init_test_time, end_test_time)
+            summary.append({"Window": label, "start_time": init_test_time, "end_time": end_test_time, **window_totals(window)})
+            if not len(window):
+                print(f"[DEBUG] Aucun intervalle trouvé pour la fenêtre {label}, vérifie les timestamps !")
+                reports.append((label, None))
+                continue
+            csv_filename = os.path.join(output_dir, f'PowDroid_{file_label(label)}_{timestamp}.csv')
+            window.to_csv(csv_filename, float_format='%f', index=False)
+            reports.append((label, csv_filename))
 
-        if n_intervals <= 0:
-            print("[DEBUG] Aucun intervalle trouvé, vérifie les timestamps !")
-            return None
-
-        def safe_first(val):
-            try:
-                if hasattr(val, '__len__') and not isinstance(val, str):
-                    return val[0] if len(val) > 0 else None
-                return val if val != 0.0 else None
-            except Exception:
-                return None
-
-        for i in range(n_intervals):
-            start_time, end_time = time_intervals[i], time_intervals[i + 1]
-            duration = end_time - start_time
-
-            volt = look_up("Voltage.csv", start_time, end_time)
-            coulomb = look_up("Coulomb charge.csv", start_time, end_time)
-            amp = look_up_intensity("Coulomb charge.csv", start_time, end_time)
-            app = look_up("Top app.csv", start_time, end_time)
-            wakelock_in = look_up("Wakelock_in.csv", start_time, end_time)
-
-            # Calculs directs pour les colonnes dérivées
-            voltage = safe_first(volt)
-            intensity = safe_first(amp)
-            duration_sec = duration / 1000 if duration else 0
-            duration_hr = duration_sec / 3600 if duration_sec else 0
-            convert_V = voltage / 1000 if voltage else 0
-            convert_A = intensity / 1000 if intensity else 0
-
-            power = convert_V * convert_A
-            consumed_charge = intensity * duration_hr if intensity else 0
-            energy = power * duration_sec
-
-            row = {
-                "start_time": start_time,
-                "end_time": end_time,
-                "Duration (mS)": duration,
-                "Voltage (mV)": voltage,
-                "Remaining_charge (mAh)": safe_first(coulomb),
-                "Intensity (mA)": intensity,
-                "Power (W)": power,
-                "Consumed charge(mAh)": consumed_charge,
-                "Energy (J)": energy,
-                "Top app": safe_first(app),
-                "Screen(ON/OFF)": look_up_bool("Screen.csv", start_time, end_time),
-                "GPS(ON/OFF)": look_up_bool("GPS.csv", start_time, end_time),
-                "Mobile_Radio(ON/OFF)": look_up_bool("Mobile radio active.csv", start_time, end_time),
-                "WiFi(ON/OFF)": look_up_bool("Wifi on.csv", start_time, end_time),
-                "Wifi radio": look_up_bool("Wifi radio.csv", start_time, end_time),
-                "Camera(ON/OFF)": look_up_bool("Camera.csv", start_time, end_time),
-                "Video (ON/OFF)": look_up_bool("Video.csv", start_time, end_time),
-                "Audio(ON/OFF)": look_up_bool("Audio.csv", start_time, end_time),
-                "Wakelock_in (Service)": safe_first(wakelock_in)
-            }
-            rows.append(row)
-
-        output_df = pandas.DataFrame(rows, columns=columns)
-
-        csv_filename = os.path.join(OUTPUT_DIR, f'PowDroid_{datetime.now().timestamp()}.csv')
-        output_df.to_csv(csv_filename, float_format='%f', index=False)
-
-        return csv_filename
+        summary_filename = os.path.join(output_dir, f'PowDroid_windows_{timestamp}.csv')
+        pandas.DataFrame(summary).to_csv(summary_filename, float_format='%f', index=False)
+        return reports, summary_filename
     except Exception as e:
-        print(f"[Debug] Error in process_csv_file() at line {e.__traceback__.tb_lineno}: {e}")
+        print(f"[Debug] Error in process_windows() at line {e.__traceback__.tb_lineno}: {e}")
         raise
+
+def interval_table(init_test_time, end_test_time, tables=None, intervals=None):
+    # Table des intervalles de la fenêtre, partagée par tous les formats de sortie
+    if intervals is not None:
+        output_df = window_intervals(intervals, init_test_time, end_test_time)
+        n_intervals = len(output_df)
+    else:
+        if tables is None:
+            tables = load_metric_tables()
+        time_intervals = union_time(tables, init_test_time, end_test_time)
+        n_intervals = len(time_intervals) - 1
+
+    if n_intervals <= 0:
+        print("[DEBUG] Aucun intervalle trouvé, vérifie les timestamps !")
+        return None
+
+    if intervals is None:
+        output_df = join_intervals(tables, time_intervals)
+    return output_df
+
+def output_stem(output_dir=None):
+    output_dir = Path(output_dir or OUTPUT_DIR)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    return os.path.join(output_dir, f'PowDroid_{datetime.now().timestamp()}')
+
+def write_csv_file(output_df, csv_filename):
+    output_df.to_csv(csv_filename, float_format='%f', index=False)
+    return csv_filename
@@ -0,0 +1,111 @@
+import csv
+import mmap
+import os
+import numpy
+
+INDEX_CHUNK_SIZE = 4 * 1024 * 1024  # octets lus d'un bloc pour construire l'index
+ROWS_CHUNK_SIZE = 50000  # lignes décodées d'un bloc pour le tri et le filtre
+ENCODING = "utf-8"
+QUOTE = ord('"')
+NEWLINE = ord("\n")
+
+class IndexCancelled(Exception):
+    pass
+
+def check(cancel):
+    if cancel and cancel.is_set():
+        raise IndexCancelled()
+
+class CsvIndex:
+    # Débuts de ligne d'un CSV projeté en mémoire (mmap) : seules les lignes affichées sont décodées.
+    # offsets[i] est le début de la ligne i du fichier (0 = en-tête), offsets[-1] la fin de la dernière.
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.size = os.fstat(self.file.fileno()).st_size
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        self.offsets = numpy.zeros(1, dtype=numpy.int64)
+        self.complete = False
+        header = self.file.readline().decode("utf-8-sig", errors="replace")
+        self.header = next(csv.reader([header]), [])
+        self.keys = {}
+
+    def build(self, cancel=None, progress=None):
+        # Fins de ligne hors guillemets : parité du nombre de guillemets vus depuis le début du fichier
+        starts = [numpy.zeros(1, dtype=numpy.int64)]
+        quoted = 0
+        for position in range(0, self.size, INDEX_CHUNK_SIZE):
+            check(cancel)
+            chunk = numpy.frombuffer(self.mm, dtype=numpy.uint8, count=min(INDEX_CHUNK_SIZE, self.size - position), offset=position)
+            parity = (numpy.cumsum(chunk == QUOTE, dtype=numpy.uint8) & 1) ^ quoted  # le modulo 256 garde la parité
+            newlines = (chunk == NEWLINE) & (parity == 0)
+            quoted = int(parity[-1])
+            starts.append(numpy.flatnonzero(newlines) + (position + 1))
+            del chunk
+            self.offsets = numpy.concatenate(starts)  # remplacé d'un coup : lisible depuis un autre thread
+            if progress:
+                progress(position + INDEX_CHUNK_SIZE, self.size)
+        if self.offsets[-1] != self.size:
+            self.offsets = numpy.append(self.offsets, self.size)  # pas de saut de ligne final
+        self.complete = True
+        return self.row_count()
+
+    def row_count(self):
+        # Lignes de données entièrement indexées (en-tête exclu)
+        return max(0, len(self.offsets) - 2)
+
+    def lines(self, indices):
+        offsets = self.offsets
+        return [self.mm[offsets[i + 1]:offsets[i + 2]].decode(ENCODING, errors="replace") for i in indices]
+
+    def rows(self, indices):
+        # Chaque élément est un enregistrement complet (retours à la ligne entre guillemets compris)
+        return list(csv.reader(self.lines(indices)))
+
+    def column_keys(self, column, cancel=None, progress=None):
+        # Clés de tri d'une colonne : nombres si toutes les valeurs présentes en sont, sinon rang du libellé
+        if column in self.keys:
+            return self.keys[column]
+        total = self.row_count()
+        values = []
+        for start in range(0, total, ROWS_CHUNK_SIZE):
+            check(cancel)
+            values.extend(row[column] if column < len(row) else "" for row in self.rows(range(start, min(start + ROWS_CHUNK_SIZE, total))))
+            if progress:
+                progress(start + ROWS_CHUNK_SIZE, total)
+        values = numpy.array(values, dtype=object)
+        missing = values == ""
+        try:
+            keys = numpy.where(missing, "nan", values).astype(numpy.float64)
+        except ValueError:
+            _, keys = numpy.unique(values.astype(str), return_inverse=True)
+            keys = keys.astype(numpy.float64)
+        keys[missing] = numpy.nan
+        self.keys = {column: keys}  # une seule colonne gardée en mémoire
+        return keys
+
+    def sort_order(self, column, descending=False, cancel=None, progress=None):
+        # Tri stable, valeurs manquantes en dernier dans les deux sens
+        keys = self.column_keys(column, cancel, progress)
+        return numpy.lexsort((-keys if descending else keys, numpy.isnan(keys)))
+
+    def filter_mask(self, text, cancel=None, progress=None):
+        # Lignes dont le texte brut contient text (sans tenir compte de la casse)
+        text = text.lower()
+        total = self.row_count()
+        mask = numpy.zeros(total, dtype=bool)
+        for start in range(0, total, ROWS_CHUNK_SIZE):
+            check(cancel)
+            stop = min(start + ROWS_CHUNK_SIZE, total)
+            mask[start:stop] = [text in line.lower() for line in self.lines(range(start, stop))]
+            if progress:
+                progress(stop, total)
+        return mask
+
+    def close(self):
+        try:
+            if self.size:
+                self.mm.close()
+        except BufferError:
+            pass  # un tableau numpy pointe encore sur le mmap : fermé avec le fichier par le GC
+        self.file.close()
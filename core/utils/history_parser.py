@@ -0,0 +1,211 @@
+import csv
+import re
+from datetime import datetime, timedelta, timezone
+
+HEADER = ["metric", "type", "start_time", "end_time", "value", "opt"]
+
+# Éléments de l'historique (nom lisible de --history et nom checkin) et métriques Battery Historian correspondantes
+BOOL_STATES = {
+    "screen": "Screen", "S": "Screen",
+    "gps": "GPS", "g": "GPS",
+    "camera": "Camera", "ca": "Camera",
+    "audio": "Audio", "a": "Audio",
+    "video": "Video", "v": "Video",
+    "mobile_radio": "Mobile radio active", "Pr": "Mobile radio active",
+    "wifi": "Wifi on", "W": "Wifi on",
+    "wifi_radio": "Wifi radio", "Wr": "Wifi radio",
+}
+INT_STATES = {
+    "volt": "Voltage", "Bv": "Voltage",
+    "charge": "Coulomb charge", "Bcc": "Coulomb charge",
+    "temp": "Temperature", "Bt": "Temperature",
+    "Bl": "Battery Level",
+}
+EVENTS = {
+    "top": "Top app", "Etp": "Top app",
+    "wake_lock_in": "Wakelock_in", "Ewl": "Wakelock_in",
+}
+
+HUMAN_LINE = re.compile(r'^\s+(0|[+-]\S+)\s+\(\d+\)\s+(.*)$')
+CHECKIN_LINE = re.compile(r'^\d+,(h|hsp),(.*)$')
+NEXT_LINE = re.compile(r'^\s*NEXT: (\d+)')
+DURATION = re.compile(r'(\d+)(ms|d|h|m|s)')
+TOKEN = re.compile(r'(?:[^\s"]|"[^"]*")+')
+UTC_OFFSET = re.compile(r'^([+-])(\d\d):?(\d\d)$')
+SPECIALS = ("RESET:", "TIME:", "START", "SHUTDOWN", "*OVERFLOW*")
+DURATION_MS = {"d": 86400000, "h": 3600000, "m": 60000, "s": 1000, "ms": 1}
+
+def parse_duration(text):
+    sign = -1 if text.startswith("-") else 1
+    return sign * sum(int(n) * DURATION_MS[unit] for n, unit in DURATION.findall(text))
+
+def parse_utc_offset(text):
+    # Sortie de "date +%z" sur le téléphone ("+0100"), None si illisible
+    match = UTC_OFFSET.match(text.strip())
+    if not match:
+        return None
+    sign, hours, minutes = match.groups()
+    return (-1 if sign == "-" else 1) * timedelta(hours=int(hours), minutes=int(minutes))
+
+def parse_human_time(text, utc_offset=None):
+    # RESET:TIME: 2024-03-01-10-00-00, affiché dans l'heure locale du téléphone ; sans son décalage UTC,
+    # le fuseau de l'ordinateur est utilisé (le format checkin, lui, donne directement l'epoch)
+    moment = datetime.strptime(text.strip(), "%Y-%m-%d-%H-%M-%S")
+    if utc_offset is not None:
+        moment = moment.replace(tzinfo=timezone(utc_offset))
+    return int(moment.timestamp() * 1000)
+
+def split_uid_name(value):
+    uid, _, name = value.partition(":")
+    return uid, name.strip('"')
+
+class HistoryState:
+    def __init__(self, utc_offset=None):
+        self.utc_offset = utc_offset
+        self.elapsed = 0
+        self.wall_base = 0
+        self.elapsed_base = 0
+        self.opened = {}
+        self.string_pool = {}
+        self.next_start = 0
+        self.touched = None
+
+    def now(self):
+        return self.wall_base + self.elapsed - self.elapsed_base
+
+    def set_time(self, wall_time):
+        self.wall_base = wall_time
+        self.elapsed_base = self.elapsed
+
+    def start(self, metric, kind, key, value, opt=""):
+        now = self.now()
+        previous = self.opened.get((metric, key))
+        if self.touched is not None:
+            self.touched.add((metric, key))
+        if previous is not None:
+            if (kind == "int" or self.touched is not None) and previous[1] == value:
+                return
+            yield from self.stop(metric, key)
+        self.opened[(metric, key)] = (now, value, opt, kind)
+
+    def stop(self, metric, key):
+        previous = self.opened.pop((metric, key), None)
+        if previous is None:
+            return
+        start_time, value, opt, kind = previous
+        end_time = self.now()
+        if end_time > start_time:
+            yield [metric, kind, start_time, end_time, value, opt]
+
+    def stop_all(self):
+        for metric, key in sorted(self.opened, key=lambda k: self.opened[k][0]):
+            yield from self.stop(metric, key)
+
+    def item(self, token):
+        sign = token[0] if token[0] in "+-" else ""
+        name, _, value = token[len(sign):].partition("=")
+        if name in BOOL_STATES and sign:
+            metric = BOOL_STATES[name]
+            if sign == "+":
+                yield from self.start(metric, "bool", None, "true")
+            else:
+                yield from self.stop(metric, None)
+        elif name in INT_STATES and value:
+            yield from self.start(INT_STATES[name], "int", None, int(value))
+        elif name in EVENTS and sign:
+            if name.startswith("E"):
+                uid, event_name = self.string_pool.get(int(value), ("", value))
+            else:
+                uid, event_name = split_uid_name(value)
+            metric = EVENTS[name]
+            if sign == "+":
+                yield from self.start(metric, "service", (uid, event_name), event_name, uid)
+            else:
+                yield from self.stop(metric, (uid, event_name))
+
+    def special(self, text, parse_time):
+        # RESET:TIME:<t>, TIME:<t>, START, SHUTDOWN, *OVERFLOW*
+        if text.startswith("RESET:") or text in ("START", "SHUTDOWN"):
+            yield from self.stop_all()
+            text = text[len("RESET:"):] if text.startswith("RESET:") else text
+        if text.startswith("TIME:"):
+            self.set_time(parse_time(text[len("TIME:"):]))
+
+    def human_line(self, offset, rest):
+        self.elapsed = parse_duration(offset)
+        if rest.startswith(SPECIALS):
+            yield from self.special(rest.strip(), lambda text: parse_human_time(text, self.utc_offset))
+            return
+        if rest[:3].isdigit():
+            yield from self.start("Battery Level", "int", None, int(rest[:3]))
+            rest = rest[3:]
+        for token in TOKEN.findall(rest):
+            yield from self.item(token)
+
+    def begin_delta(self):
+        # Une sortie de --history-start N recommence ses décalages à la base de l'historique
+        # et réimprime l'état complet au premier enregistrement
+        self.elapsed = 0
+        self.touched = set()
+
+    def resync(self, tokens):
+        for token in tokens:
+            yield from self.item(token)
+        touched, self.touched = self.touched, None
+        for metric, key in [k for k in self.opened if k not in touched]:
+            yield from self.stop(metric, key)
+
+    def checkin_line(self, kind, fields):
+        if kind == "hsp":
+            index, uid, name = next(csv.reader([fields]))[:3]
+            self.string_pool[int(index)] = (uid, name)
+            return
+        items = fields.split(",")
+        delta, _, special = items[0].partition(":")
+        self.elapsed += int(delta)
+        if special:
+            yield from self.special(special, int)
+        tokens = [token for token in items[1:] if token]
+        if self.touched is not None and tokens:
+            yield from self.resync(tokens)
+            return
+        for token in tokens:
+            yield from self.item(token)
+
+def parse_history(lines, state=None, utc_offset=None):
+    # Avec un état fourni (collecte par deltas), les intervalles encore ouverts ne sont pas clos
+    final = state is None
+    state = state or HistoryState(utc_offset)
+    in_human_history = False
+    for line in lines:
+        line = line.rstrip("\r\n")
+        match = NEXT_LINE.match(line)
+        if match:
+            state.next_start = int(match.group(1))
+            continue
+        match = CHECKIN_LINE.match(line)
+        if match:
+            yield from state.checkin_line(match.group(1), match.group(2))
+            continue
+        if line.startswith("Battery History"):
+            in_human_history = True
+            continue
+        if in_human_history:
+            match = HUMAN_LINE.match(line)
+            if match:
+                yield from state.human_line(match.group(1), match.group(2))
+            elif line and not line[0].isspace():
+                in_human_history = False
+    if final:
+        yield from state.stop_all()
+
+def parse_file(path, utc_offset=None):
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        yield from parse_history(f, utc_offset=utc_offset)
+
+def convert(batterystats_path, csv_path, utc_offset=None):
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(parse_file(batterystats_path, utc_offset))
+    return csv_path
@@ -1,56 +1,25 @@
-import csv
+import base64
+import io
+import json
+import math
 import os
-from datetime import datetime, timezone, timedelta
-
-def parse_csv(filepath):
-    energy_data = []
-    timestamps = []
-    rows = []
-    with open(filepath, 'r') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            rows.append(row)
-            try:
-                timestamp = int(row['start_time']) / 1000
-                dt = datetime.fromtimestamp(timestamp, tz=timezone.utc)
-                tz_offset = timedelta(hours=2)
-                local_dt = dt + tz_offset
-                tz_diff = f"GMT{'+' if tz_offset.total_seconds() >= 0 else '-'}{abs(tz_offset.total_seconds()) // 3600:.0f}"
-                timestamps.append(local_dt.strftime(f'%Y-%m-%d %H:%M:%S ({tz_diff})'))
-                energy_value = float(row['Energy (J)'])
-                energy_data.append(energy_value)
-            except (ValueError, KeyError):
-                continue
-    return timestamps, energy_data, rows
-
-def reduce_data(timestamps, energy_data, percentage):
-    num_points = max(1, int(len(timestamps) * (percentage / 100)))
-    step = len(timestamps) / num_points
-    reduced_timestamps = []
-    reduced_energy = []
-    for i in range(num_points):
-        start_idx = int(i * step)
-        end_idx = int((i + 1) * step)
-        chunk = slice(start_idx, min(end_idx, len(timestamps)))
-        reduced_timestamps.append(timestamps[chunk.start])
-        valid_energy = [e for e in energy_data[chunk] if e >= 0]
-        if valid_energy:
-            reduced_energy.append(sum(valid_energy) / len(valid_energy))
-        else:
-            reduced_energy.append(0)
-    return reduced_timestamps, reduced_energy
-
-def generate_html(timestamps, energy_data, rows):
-    table_headers = rows[0].keys()
-    table_rows = ''.join(
-        f"<tr>{''.join(f'<td>{str(cell).replace(chr(10), " ").replace(chr(13), " ")}</td>' for cell in row.values())}</tr>" for row in rows
-    )
-    html_content = f"""
-    <!DOCTYPE html>
+import tempfile
+import numpy
+import pandas
+
+BASE64_CHUNK_SIZE = 3 * 1024 * 1024  # multiple de 3 : les blocs encodés se suivent sans padding
+PYRAMID_BASE = 2000  # seaux du niveau le plus grossier du graphique
+PYRAMID_FACTOR = 4  # rapport entre deux niveaux successifs
+REPORT_LIBRARIES = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), name) for name in ("report_chart.js", "report_table.js")
+]
+COLUMN_SPOOL_SIZE = 1024 * 1024  # données de chaque colonne du tableau gardées en mémoire avant de passer sur disque
+TYPED_ARRAYS = {"BigInt64Array": "<i8", "Int32Array": "<i4", "Float32Array": "<f4"}
+
+HEAD_TEMPLATE = """    <!DOCTYPE html>
     <html>
     <head>
         <title>Energy Chart</title>
-        <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
         <style>
             .chart-container {{
                 width: 80%;
@@ -86,7 +55,10 @@ def generate_html(timestamps, energy_data, rows):
                 position: sticky;
                 top: 0;
             }}
-            tr:nth-child(even) {{
+            th {{
+                cursor: pointer;
+            }}
+            tr.even {{
                 background-color: #f9f9f9;
             }}
         </style>
@@ -94,21 +66,24 @@ def generate_html(timestamps, energy_data, rows):
     <body>
         <h1 style="text-align: center;">Energy Chart</h1>
         <div class="chart-container">
-            <canvas id="energyChart"></canvas>
+            <canvas id="energyChart" style="width: 100%; height: 400px;"></canvas>
         </div>
         <div class="controls">
-            <div id="percentageControl">
-                <label for="percentagePoints">Percentage of Graph Points:</label>
-                <input type="number" id="percentagePoints" value="100" min="10" max="100" step="10">
-                <button onclick="updateChart()">Update</button>
+            <div>
+                <button onclick="resetZoom()">Reset Zoom</button>
+                <span id="chartLevel"></span>
             </div>
             <div>
                 <label for="searchApp">Search:</label>
-                <input type="text" id="searchApp" placeholder="Search in table">
+                <input type="text" id="searchApp" placeholder="Search in table" onkeydown="if (event.key === 'Enter') searchTable()">
                 <button onclick="searchTable()">Search</button>
+                <span id="rowCount"></span>
             </div>
             <div>
-                <label for="sortOrder">Sort Energy:</label>
+                <label for="sortColumn">Sort by:</label>
+                <select id="sortColumn" onchange="sortTable()">
+                    <option value="">None</option>{sort_options}
+                </select>
                 <select id="sortOrder" onchange="sortTable()">
                     <option value="asc">Ascending</option>
                     <option value="desc">Descending</option>
@@ -118,154 +93,331 @@ def generate_html(timestamps, energy_data, rows):
                 <label for="chartView">Select View:</label>
                 <select id="chartView" onchange="updateChartView()">
                     <option value="energy">Energy (J)</option>
-                    <option value="cumulativeEnergy">Cumulative Energy (J)</option>
+                    <option value="power">Power (W)</option>
+                    <option value="cumulative">Cumulative Energy (J)</option>
                 </select>
             </div>
         </div>
         <div class="table-container">
             <table id="dataTable">
                 <thead>
-                    <tr>{''.join(f'<th>{header}</th>' for header in table_headers)}</tr>
+                    <tr>{headers}</tr>
                 </thead>
                 <tbody>
-                    {table_rows}
-                </tbody>
+"""
+
+TABLE_END_TEMPLATE = """                </tbody>
             </table>
         </div>
         <script>
-            let originalData = {{
-                timestamps: {timestamps},
-                energy: {energy_data}
+            const decodeArray = (text, type) => {{
+                const binary = atob(text);
+                const bytes = new Uint8Array(binary.length);
+                for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
+                if (type === BigInt64Array) return Float64Array.from(new BigInt64Array(bytes.buffer), Number);  // ms exacts sous 2**53
+                return new type(bytes.buffer);
             }};
 
-            const createChart = (ctxId, label, data, xLabel, yLabel) => {{
-                const ctx = document.getElementById(ctxId).getContext('2d');
-                return new Chart(ctx, {{
-                    type: 'line',
-                    data: {{
-                        labels: data.timestamps,
-                        datasets: [{{
-                            label: label,
-                            data: data.values,
-                            borderColor: 'rgba(75, 192, 192, 1)',
-                            backgroundColor: 'rgba(75, 192, 192, 0.2)',
-                            borderWidth: 2
-                        }}]
-                    }},
-                    options: {{
-                        responsive: true,
-                        plugins: {{
-                            legend: {{
-                                position: 'top',
-                            }}
-                        }},
-                        scales: {{
-                            x: {{
-                                title: {{
-                                    display: true,
-                                    text: xLabel
-                                }}
-                            }},
-                            y: {{
-                                title: {{
-                                    display: true,
-                                    text: yLabel
-                                }}
-                            }}
-                        }}
-                    }}
-                }});
-            }};
+"""
 
-            let energyChart = createChart('energyChart', 'Energy (J)', {{ timestamps: originalData.timestamps, values: originalData.energy }}, 'Converted Timestamp', 'Energy (J)');
+SCRIPT_TEMPLATE = """            // Pyramide calculée côté serveur : le niveau le plus grossier d'abord, les niveaux fins au zoom
+            const MAX_POINTS = 2000;
+            const VIEW_LABELS = {{ energy: 'Energy (J)', power: 'Power (W)', cumulative: 'Cumulative Energy (J)' }};
+            let chartView = 'energy';
+            let chartRange = null;
 
-            const updateChart = () => {{
-                const percentage = parseInt(document.getElementById('percentagePoints').value);
-                const reducedData = reduceData(originalData.timestamps, originalData.energy, percentage);
-                energyChart.data.labels = reducedData.timestamps;
-                energyChart.data.datasets[0].data = reducedData.energy;
-                energyChart.update();
+            const lowerBound = (array, value) => {{
+                let lo = 0, hi = array.length;
+                while (lo < hi) {{
+                    const mid = (lo + hi) >> 1;
+                    if (array[mid] < value) lo = mid + 1; else hi = mid;
+                }}
+                return lo;
             }};
 
-            const reduceData = (timestamps, energy, percentage) => {{
-                const numPoints = Math.max(1, Math.floor((percentage / 100) * timestamps.length));
-                const step = timestamps.length / numPoints;
-                const reducedTimestamps = [];
-                const reducedEnergy = [];
-                for (let i = 0; i < numPoints; i++) {{
-                    const startIdx = Math.floor(i * step);
-                    const endIdx = Math.floor((i + 1) * step);
-                    const chunk = energy.slice(startIdx, endIdx);
-                    reducedTimestamps.push(timestamps[startIdx]);
-                    const validChunk = chunk.filter(e => e >= 0);
-                    if (validChunk.length > 0) {{
-                        reducedEnergy.push(validChunk.reduce((a, b) => a + b, 0) / validChunk.length);
-                    }} else {{
-                        reducedEnergy.push(0);
+            const formatTime = (value) => new Date(value).toLocaleString(undefined, {{ timeZoneName: 'short' }});
+
+            const chartPoints = () => {{
+                const t = chartData.t;
+                const values = chartData.series[chartView];
+                const lo = chartRange ? lowerBound(t, chartRange[0]) : 0;
+                const hi = chartRange ? lowerBound(t, chartRange[1] + 1) : t.length;
+                let level = null;
+                if (hi - lo > MAX_POINTS) {{
+                    // Niveau le plus fin dont le nombre de seaux visibles reste sous MAX_POINTS
+                    for (const candidate of chartData.levels) {{
+                        if (level && candidate.edges.length * (hi - lo) / t.length > MAX_POINTS) break;
+                        level = candidate;
                     }}
                 }}
-                return {{ timestamps: reducedTimestamps, energy: reducedEnergy }};
+                if (!level) {{
+                    return {{
+                        line: {{ x: t.subarray(lo, hi), y: values.subarray(lo, hi) }},
+                        band: {{ x: [], low: [], high: [] }},
+                        level: 'all points'
+                    }};
+                }}
+                const series = level[chartView];
+                const first = lowerBound(series.lttb, lo);
+                const last = lowerBound(series.lttb, hi);
+                const line = {{ x: new Float64Array(last - first), y: new Float32Array(last - first) }};
+                for (let k = first; k < last; k++) {{
+                    line.x[k - first] = t[series.lttb[k]];
+                    line.y[k - first] = values[series.lttb[k]];
+                }}
+                const b0 = Math.max(0, lowerBound(level.edges, lo + 1) - 1);
+                const b1 = lowerBound(level.edges, hi);
+                const band = {{ x: new Float64Array(b1 - b0), low: series.min.subarray(b0, b1), high: series.max.subarray(b0, b1) }};
+                for (let b = b0; b < b1; b++) band.x[b - b0] = t[Math.max(level.edges[b], lo)];
+                return {{ line: line, band: band, level: `${{level.edges.length}} buckets` }};
             }};
 
-            const calculateCumulativeEnergy = (energy) => {{
-                const cumulative = [];
-                energy.reduce((acc, value, index) => {{
-                    cumulative[index] = acc + value;
-                    return cumulative[index];
-                }}, 0);
-                return cumulative;
+            const energyChart = createLineChart(document.getElementById('energyChart'), {{
+                label: VIEW_LABELS[chartView],
+                xLabel: 'Converted Timestamp',
+                yLabel: VIEW_LABELS[chartView],
+                formatX: formatTime
+            }});
+
+            const updateChart = () => {{
+                const points = chartPoints();
+                energyChart.label = VIEW_LABELS[chartView];
+                energyChart.yLabel = VIEW_LABELS[chartView];
+                energyChart.line = points.line;
+                energyChart.band = points.band;
+                energyChart.draw();
+                document.getElementById('chartLevel').textContent = `Level: ${{points.level}}`;
             }};
 
             const updateChartView = () => {{
-                const selectedView = document.getElementById('chartView').value;
-                let updatedData;
-
-                if (selectedView === 'cumulativeEnergy') {{
-                    updatedData = calculateCumulativeEnergy(originalData.energy);
-                    document.getElementById('percentageControl').style.display = 'none';
-                }} else {{
-                    updatedData = originalData.energy;
-                    document.getElementById('percentageControl').style.display = 'block';
-                }}
+                chartView = document.getElementById('chartView').value;
+                updateChart();
+            }};
 
-                energyChart.data.datasets[0].data = updatedData;
-                energyChart.update();
+            const resetZoom = () => {{
+                chartRange = null;
+                updateChart();
             }};
 
-            const searchTable = () => {{
-                const searchValue = document.getElementById('searchApp').value.toLowerCase();
-                const rows = document.querySelectorAll('#dataTable tbody tr');
-                rows.forEach(row => {{
-                    const cells = Array.from(row.cells);
-                    const matches = cells.some(cell => cell.textContent.toLowerCase().includes(searchValue));
-                    row.style.display = matches ? '' : 'none';
-                }});
+            energyChart.onZoom = (range) => {{
+                chartRange = range;
+                updateChart();
             }};
 
-            const sortTable = () => {{
-                const table = document.getElementById('dataTable');
-                const rows = Array.from(table.rows).slice(1); // Exclude header row
-                const sortOrder = document.getElementById('sortOrder').value;
-                const energyIndex = Array.from(table.rows[0].cells).findIndex(cell => cell.textContent === 'Energy (J)'); // Find the energy column index
+            updateChart();
 
-                rows.sort((a, b) => {{
-                    const energyA = parseFloat(a.cells[energyIndex].textContent) || 0;
-                    const energyB = parseFloat(b.cells[energyIndex].textContent) || 0;
-                    return sortOrder === 'asc' ? energyA - energyB : energyB - energyA;
-                }});
+            const dataTable = createDataTable(document.querySelector('.table-container'), tableData);
+            dataTable.onQuery = (count) => {{
+                document.getElementById('rowCount').textContent = `${{count}} / ${{tableData.size}} rows`;
+            }};
 
-                const tbody = table.querySelector('tbody');
-                rows.forEach(row => tbody.appendChild(row));
+            const queryTable = () => {{
+                const sortColumn = document.getElementById('sortColumn').value;
+                dataTable.query(
+                    document.getElementById('searchApp').value,
+                    sortColumn === '' ? null : parseInt(sortColumn),
+                    document.getElementById('sortOrder').value
+                );
             }};
+
+            const searchTable = queryTable;
+            const sortTable = queryTable;
+
+            // Clic sur un en-tête : tri sur cette colonne, un second clic inverse l'ordre
+            document.querySelectorAll('#dataTable th').forEach((th, index) => {{
+                th.addEventListener('click', () => {{
+                    const sortColumn = document.getElementById('sortColumn');
+                    const sortOrder = document.getElementById('sortOrder');
+                    sortOrder.value = sortColumn.value === String(index) && sortOrder.value === 'asc' ? 'desc' : 'asc';
+                    sortColumn.value = String(index);
+                    queryTable();
+                }});
+            }});
+            dataTable.onQuery(tableData.size);
         </script>
     </body>
     </html>
-    """
-    return html_content
+"""
+
+def bucket_edges(size, buckets):
+    # Début de chaque seau (tailles égales à un point près), plus la fin de la série
+    return numpy.unique(numpy.linspace(0, size, buckets + 1).astype(numpy.int64))
+
+def lttb(t, values, edges):
+    # Largest-Triangle-Three-Buckets vectorisé : dans chaque seau, le point qui forme le plus grand
+    # triangle avec les moyennes des seaux voisins (au lieu du point retenu précédent, séquentiel)
+    starts = edges[:-1]
+    counts = numpy.diff(edges)
+    values = numpy.nan_to_num(values)
+    mean_t = numpy.add.reduceat(t, starts) / counts
+    mean_v = numpy.add.reduceat(values, starts) / counts
+    bucket = numpy.repeat(numpy.arange(len(starts)), counts)
+    a_t = numpy.concatenate(([t[0]], mean_t[:-1]))[bucket]
+    a_v = numpy.concatenate(([values[0]], mean_v[:-1]))[bucket]
+    c_t = numpy.concatenate((mean_t[1:], [t[-1]]))[bucket]
+    c_v = numpy.concatenate((mean_v[1:], [values[-1]]))[bucket]
+    area = numpy.abs((a_t - c_t) * (values - a_v) - (a_t - t) * (c_v - a_v))
+    order = numpy.lexsort((-area, bucket))
+    return numpy.unique(numpy.concatenate(([0], order[starts], [len(t) - 1])))
+
+def envelope(values, edges):
+    # Min/max par seau : les pics restent visibles quel que soit le niveau
+    starts = edges[:-1]
+    with numpy.errstate(invalid="ignore"):
+        return numpy.fmin.reduceat(values, starts), numpy.fmax.reduceat(values, starts)
+
+def chart_pyramid(t, series):
+    # Niveaux de PYRAMID_BASE, PYRAMID_BASE * PYRAMID_FACTOR, ... seaux, tant qu'ils réduisent la série
+    levels = []
+    buckets = PYRAMID_BASE
+    t = t.astype(numpy.float64)
+    while buckets < len(t):
+        edges = bucket_edges(len(t), buckets)
+        level = {"edges": edges[:-1]}
+        for name, values in series.items():
+            low, high = envelope(values, edges)
+            level[name] = {"lttb": lttb(t, values, edges), "min": low, "max": high}
+        levels.append(level)
+        buckets *= PYRAMID_FACTOR
+    return levels
+
+def write_typed_array(f, values, js_type):
+    # Tableau typé encodé en base64 (little-endian), décodé par decodeArray dans le navigateur
+    data = memoryview(numpy.ascontiguousarray(values, dtype=TYPED_ARRAYS[js_type])).cast("B")
+    f.write('decodeArray("')
+    for offset in range(0, len(data), BASE64_CHUNK_SIZE):
+        f.write(base64.b64encode(data[offset:offset + BASE64_CHUNK_SIZE]).decode("ascii"))
+    f.write(f'", {js_type})')
+
+def write_chart_data(f, t, series):
+    f.write("            const chartData = {\n                t: ")
+    write_typed_array(f, t, "BigInt64Array")
+    f.write(",\n                series: {")
+    for index, (name, values) in enumerate(series.items()):
+        f.write(f"{',' if index else ''}\n                    {name}: ")
+        write_typed_array(f, values, "Float32Array")
+    f.write("\n                },\n                levels: [")
+    for index, level in enumerate(chart_pyramid(t, series)):
+        f.write(f"{',' if index else ''}\n                    {{ edges: ")
+        write_typed_array(f, level["edges"], "Int32Array")
+        for name in series:
+            f.write(f", {name}: {{ lttb: ")
+            write_typed_array(f, level[name]["lttb"], "Int32Array")
+            f.write(", min: ")
+            write_typed_array(f, level[name]["min"], "Float32Array")
+            f.write(", max: ")
+            write_typed_array(f, level[name]["max"], "Float32Array")
+            f.write(" }")
+        f.write(" }")
+    f.write("\n                ]\n            };\n\n")
+
+def report_library():
+    code = []
+    for path in REPORT_LIBRARIES:
+        with open(path, encoding="utf-8") as f:
+            code.append(f.read())
+    return ''.join(code)
+
+def escape_cells(text):
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace("\n", " ").replace("\r", " ")
+
+class TableColumn:
+    # Colonne du tableau du rapport, gardée dans un fichier temporaire : Float64 pour une colonne
+    # numérique, sinon codes Uint32 vers une liste de libellés
+    def __init__(self, name):
+        self.name = name
+        self.numeric = True
+        self.labels = {}
+        self.data = tempfile.SpooledTemporaryFile(COLUMN_SPOOL_SIZE)
 
-def process_html_file(file_path):
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(f"CSV file not found: {file_path}")
+    def write(self, f):
+        self.data.seek(0)
+        f.write('decodeArray("')
+        for chunk in iter(lambda: self.data.read(BASE64_CHUNK_SIZE), b""):
+            f.write(base64.b64encode(chunk).decode("ascii"))
+        if self.numeric:
+            f.write('", Float64Array)')
+        else:
+            f.write(f'", Uint32Array), labels: {js_json(list(self.labels))}')
+
+    def close(self):
+        self.data.close()
+
+def js_json(value):
+    # JSON inclus dans le <script> : aucun "</script>" ni "<!--" possible dans les chaînes
+    return json.dumps(value).replace("<", "\\u003c")
+
+def write_table_data(f, columns, size):
+    f.write(f"            const tableData = {{\n                size: {size},\n                columns: {js_json([column.name for column in columns])},\n                values: [")
+    for index, column in enumerate(columns):
+        f.write(f"{',' if index else ''}\n                    {'' if column.numeric else '{ codes: '}")
+        column.write(f)
+        if not column.numeric:
+            f.write(" }")
+    f.write("\n                ]\n            };\n\n")
+
+def write_head(f, names):
+    headers = ''.join(f'<th title="Sort by {escape_cells(name)}">{escape_cells(name)}</th>' for name in names)
+    sort_options = ''.join(f'\n                    <option value="{index}">{escape_cells(name)}</option>' for index, name in enumerate(names))
+    f.write(HEAD_TEMPLATE.format(headers=headers, sort_options=sort_options))
+
+def chart_series(energy, power):
+    return {"energy": energy, "power": power, "cumulative": numpy.nancumsum(energy)}
+
+def write_report(f, columns, size, timestamps, series):
+    f.write(TABLE_END_TEMPLATE.format())
+    f.write(report_library())
+    write_chart_data(f, timestamps, series)
+    write_table_data(f, columns, size)
+    f.write(SCRIPT_TEMPLATE.format())
+
+def frame_column(name, values):
+    # Colonne du DataFrame déjà typée : numérique ou libellés d'après son dtype
+    column = TableColumn(name)
+    if values.dtype.kind in "iuf":
+        column.data.write(values.to_numpy(dtype="<f8", na_value=math.nan).tobytes())
+    else:
+        text = values.astype(object).where(values.notna(), "").astype(str)
+        codes, labels = pandas.factorize(text)
+        column.numeric = False
+        column.labels = {label: code for code, label in enumerate(labels)}
+        column.data.write(codes.astype("<u4").tobytes())
+    return column
+
+def frame_numbers(df, name):
+    if name not in df.columns:
+        return numpy.full(len(df), math.nan)
+    return pandas.to_numeric(df[name], errors="coerce").to_numpy(dtype=numpy.float64, na_value=math.nan)
+
+def write_html_frame(f, df):
+    # Table des intervalles en mémoire : colonnes et séries du graphique prises directement,
+    # les timestamps restent en ms (int64) et sont affichés dans le fuseau du navigateur
+    names = [str(name) for name in df.columns]
+    write_head(f, names)
+    columns = []
+    try:
+        columns = [frame_column(name, df[column]) for name, column in zip(names, df.columns)]
+        if "start_time" in df.columns:
+            timestamps = df["start_time"].to_numpy(dtype=numpy.int64)
+            series = chart_series(frame_numbers(df, 'Energy (J)'), frame_numbers(df, 'Power (W)'))
+        else:
+            timestamps = numpy.zeros(0, dtype=numpy.int64)
+            series = chart_series(numpy.zeros(0), numpy.zeros(0))
+        write_report(f, columns, len(df), timestamps, series)
+    finally:
+        for column in columns:
+            column.close()
 
-    timestamps, energy_data, rows = parse_csv(file_path)
-    return generate_html(timestamps, energy_data, rows)
+def process_html_frame(df, html_path=None):
+    # Rendu depuis la table des intervalles (CLI, GUI)
+    try:
+        if html_path:
+            with open(html_path, "w", encoding="utf-8") as f:
+                write_html_frame(f, df)
+            return html_path
+        output = io.StringIO()
+        write_html_frame(output, df)
+        return output.getvalue()
+    except Exception as e:
+        print(f"[Debug] Error in process_html_frame() at line {e.__traceback__.tb_lineno}: {e}")
+        raise
@@ -0,0 +1,76 @@
+import copy
+import subprocess
+import threading
+import time
+from pathlib import Path
+from . import adb_client
+from . import adb_runner as adb
+from . import csv_handler as csv
+from . import history_parser
+
+LIVE_INTERVAL = 30  # secondes entre deux lectures de l'historique
+
+class LiveCollector(threading.Thread):
+    # Lit l'historique de batterystats par deltas (--history-start) pendant l'enregistrement,
+    # pour qu'il ne reste que les dernières secondes à traiter en fin de session
+    def __init__(self, device, interval=LIVE_INTERVAL, dump_dir=None, verbose=False):
+        super().__init__(daemon=True)
+        self.device = device
+        self.interval = interval
+        self.verbose = verbose
+        self.dump_dir = Path(dump_dir or adb.DUMP_DIR).resolve()
+        self.state = history_parser.HistoryState()
+        self.parts = []
+        self.deltas = 0
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    @property
+    def checkpoint_path(self):
+        return self.dump_dir / "history_checkpoint.txt"
+
+    def collect(self):
+        with self.lock:
+            history_start = self.state.next_start
+            state = copy.deepcopy(self.state)
+            state.begin_delta()
+            start = time.perf_counter()
+            lines = list(adb.stream_batterystats_history(self.device, history_start))
+            rows = list(history_parser.parse_history(lines, state))
+            # L'état n'avance qu'une fois le delta complet lu : un échec le fait relire en entier
+            self.state = state
+            with open(self.dump_dir / "batterystats.txt", "a", encoding="utf-8") as raw:
+                raw.writelines(lines)
+            self.parts.append(csv.tables_from_rows(rows))
+            self.deltas += 1
+            self.checkpoint_path.write_text(f"{state.next_start}\n")
+            if self.verbose:
+                print(f"[PowDroid] Live delta {self.deltas}: {len(rows)} intervals from history position {history_start} in {time.perf_counter() - start:.2f}s")
+            return len(rows)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.collect()
+            except (OSError, adb_client.AdbError, subprocess.CalledProcessError) as e:
+                # Réseau instable : le delta sera relu au prochain passage
+                if self.verbose:
+                    print(f"[Debug] Live collection of {self.device} failed: {e}")
+
+    def finish(self):
+        self.stopped.set()
+        if self.is_alive():
+            self.join()
+        try:
+            self.collect()
+        except (OSError, adb_client.AdbError, subprocess.CalledProcessError) as e:
+            # Dernière lecture impossible : les deltas déjà collectés sont gardés
+            print(f"[Debug] Last live collection of {self.device} failed, the session ends at the previous delta: {e}")
+        with self.lock:
+            self.parts.append(csv.tables_from_rows(self.state.stop_all()))
+            return csv.merge_tables(self.parts)
+
+    def start(self):
+        self.dump_dir.mkdir(parents=True, exist_ok=True)
+        (self.dump_dir / "batterystats.txt").write_text("")
+        super().start()
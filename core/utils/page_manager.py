@@ -3,8 +3,11 @@ from tkinter import filedialog, messagebox, BooleanVar
 from . import adb_runner as adb
 from . import csv_handler as csv
 from . import html_renderer as html
+from . import session_cache
+from . import background_jobs as jobs
+from . import table_view
 
-import csv as pycsv
+import queue
 from pathlib import Path
 from datetime import datetime
 from tkinter import PhotoImage
@@ -73,6 +76,12 @@ def create_pages(app):
     ).pack(pady=20)
 
     def refresh_data_session():
+        if current_job["job"]:
+            current_job["job"].cancel()
+            current_job["job"] = None
+        for progress, cancel_btn in (detect_widgets, record_widgets, process_widgets, generate_widgets):
+            progress.pack_forget()
+            cancel_btn.pack_forget()
         step2_frame.pack_forget()
         step3_frame.pack_forget()
         step4_frame.pack_forget()
@@ -99,6 +108,54 @@ def create_pages(app):
 
     session = {"start": None, "stop": None, "device": None, "file_name": None, "csv_path": None}
 
+    # Les étapes bloquantes (adb, conversion, tables) tournent dans un BackgroundJob, un seul à la fois :
+    # la fenêtre reste réactive, l'avancement et les durées par étape s'affichent sous chaque étape
+    current_job = {"job": None}
+
+    def job_widgets(frame):
+        progress = ttk.Progressbar(frame, mode="determinate", maximum=100)
+        cancel_btn = ttk.Button(frame, text="Cancel", takefocus=0)
+        return progress, cancel_btn
+
+    def run_job(stages, label, button, widgets, on_done):
+        progress, cancel_btn = widgets
+
+        def finish():
+            if current_job["job"] is not job:
+                return False  # job abandonné (Refresh) : l'interface a déjà été réinitialisée
+            current_job["job"] = None
+            progress.pack_forget()
+            cancel_btn.pack_forget()
+            return True
+
+        def on_progress(stage, index, count, message):
+            if current_job["job"] is job:
+                progress.config(value=100 * index / count)
+                label.config(text=message or f"Running {stage}... (step {index + 1}/{count})", foreground="orange")
+
+        def on_job_done(results):
+            if finish():
+                on_done(results, f"Stage timings: {job.format_timings()}")
+
+        def on_error(e):
+            if finish():
+                label.config(text=f"Error: {e}", foreground="red")
+                button.config(state="normal")
+
+        def on_cancel():
+            if finish():
+                label.config(text="Cancelled.", foreground="red")
+                button.config(state="normal")
+
+        job = jobs.BackgroundJob(app, stages, on_progress, on_job_done, on_error, on_cancel)
+        current_job["job"] = job
+        button.config(state="disabled")
+        progress.config(value=0)
+        progress.pack(fill="x", pady=(0, 10), before=button)
+        cancel_btn.config(command=job.cancel)
+        cancel_btn.pack(anchor="e", pady=(5, 0), after=button)
+        job.start()
+
     # --- STEP 1: Initialize connection ---
     step1_frame = ttk.LabelFrame(
         data_session_page,
@@ -114,23 +171,66 @@ def create_pages(app):
     )
     detect_label.pack(anchor="w", pady=(0, 10))
 
+    device_status_label = ttk.Label(
+        step1_frame,
+        text="USB: waiting for adb events...",
+        font=("Segoe UI", 9),
+        foreground="#888888"
+    )
+    device_status_label.pack(anchor="w", pady=(0, 10))
+
+    # Les événements adb arrivent sur le thread du DeviceWatcher, Tk ne doit être touché que depuis la boucle principale
+    device_events = queue.Queue()
+
+    def poll_device_events():
+        while True:
+            try:
+                kind, value = device_events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "connected":
+                device_status_label.config(text=f"USB: device {value} connected", foreground="green")
+            elif kind == "disconnected":
+                device_status_label.config(text=f"USB: device {value} disconnected", foreground="orange")
+            else:
+                device_status_label.config(text=f"USB: device tracking unavailable ({value})", foreground="red")
+        app.after(200, poll_device_events)
+
+    device_watcher = adb.DeviceWatcher(lambda kind, value: device_events.put((kind, value)))
+    device_watcher.start()
+    poll_device_events()
+
+    def wait_for_devices(job, condition):
+        # Les étapes attendent les listes du DeviceWatcher ; sans suivi adb, retour à l'interrogation de "adb devices"
+        value = device_watcher.wait_for(condition, job.cancelled)
+        if value is None:
+            value = job.wait_until(lambda: condition(set(adb.get_connected_devices())))
+        return value
+
+    def first_device(devices):
+        return min(devices) if devices else None
+
     def on_detect():
-        detect_label.config(foreground="orange", text="Searching for device...")
-        app.update_idletasks()
-        device = adb.get_connected_device()
-        if not device:
-            detect_label.config(text="No device detected. Please connect your device via USB.", foreground="red")
-            adb.wait_for_device_connection(verbose=True)
+        def detect(job):
+            job.progress("Searching for device...")
             device = adb.get_connected_device()
             if not device:
-                detect_label.config(text="Device still not detected. Please try again.", foreground="red")
-                return
-        session["device"] = device
-        detect_label.config(text=f"Device detected: {device}", foreground="green")
-        adb.kill_all()
-        adb.clear_batterystats(verbose=True)
-        step2_frame.pack(fill="x", pady=10, padx=10)
-        detect_btn.config(state="disabled")
+                job.progress("No device detected. Please connect your device via USB.")
+                device = wait_for_devices(job, first_device)
+            return device
+
+        def reset(job):
+            device = job.results["detect"]
+            job.progress(f"Device detected: {device}, resetting battery stats...")
+            adb.kill_all(device)
+            adb.clear_batterystats(verbose=True, device=device)
+
+        def done(results, timings):
+            session["device"] = results["detect"]
+            detect_label.config(text=f"Device detected: {results['detect']}\n{timings}", foreground="green")
+            step2_frame.pack(fill="x", pady=10, padx=10)
+
+        run_job([("detect", detect), ("reset", reset)], detect_label, detect_btn, detect_widgets, done)
 
     detect_btn = ttk.Button(
         step1_frame,
@@ -139,6 +239,7 @@ def create_pages(app):
         command=on_detect
     )
     detect_btn.pack(anchor="e")
+    detect_widgets = job_widgets(step1_frame)
 
     # --- STEP 2: Start recording (initially hidden) ---
     step2_frame = ttk.LabelFrame(
@@ -163,16 +264,21 @@ def create_pages(app):
     record_label.pack(anchor="w", pady=(0, 10))
 
     def on_start_record():
-        record_label.config(text="Waiting for device disconnection...", foreground="orange")
-        app.update_idletasks()
-        adb.wait_for_device_disconnection(verbose=True)
-        session["start"] = datetime.now()
-        record_label.config(
-            text=f"Recording started at {session['start'].strftime('%Y-%m-%d %H:%M:%S')}. Please perform your test.",
-            foreground="green"
-        )
-        start_record_btn.config(state="disabled")
-        finish_record_btn.config(state="normal")
+        def wait(job):
+            job.progress("Waiting for device disconnection...")
+            device = session["device"]
+            wait_for_devices(job, lambda devices: device not in devices if device else not devices)
+            return datetime.now()
+
+        def done(results, timings):
+            session["start"] = results["wait"]
+            record_label.config(
+                text=f"Recording started at {session['start'].strftime('%Y-%m-%d %H:%M:%S')}. Please perform your test.",
+                foreground="green"
+            )
+            finish_record_btn.config(state="normal")
+
+        run_job([("wait", wait)], record_label, start_record_btn, record_widgets, done)
 
     start_record_btn = ttk.Button(
         step2_frame,
@@ -181,6 +287,7 @@ def create_pages(app):
         command=on_start_record
     )
     start_record_btn.pack(anchor="e")
+    record_widgets = job_widgets(step2_frame)
 
     def on_finish_record():
         session["stop"] = datetime.now()
@@ -222,16 +329,24 @@ def create_pages(app):
     process_label.pack(anchor="w", pady=(0, 10))
 
     def on_process_data():
-        process_label.config(text="Waiting for device connection...", foreground="orange")
-        app.update_idletasks()
-        adb.wait_for_device_connection(verbose=True)
-        process_label.config(text="Processing battery data...", foreground="green")
-        adb.dump_batterystats(verbose=True)
-        file_name = adb.conversion_batterystats()
-        session["file_name"] = file_name
-        process_label.config(text=f"Battery data processed: {file_name}", foreground="green")
-        step4_frame.pack(fill="x", pady=10, padx=10)
-        process_data_btn.config(state="disabled")
+        def wait(job):
+            job.progress("Waiting for device connection...")
+            return wait_for_devices(job, first_device)
+
+        def capture(job):
+            job.progress("Extracting battery data...")
+            adb.dump_batterystats(verbose=True, device=job.results["wait"], spinner=False, cancel=job.cancelled)
+
+        def conversion(job):
+            job.progress("Processing battery data...")
+            return adb.conversion_batterystats(cancel=job.cancelled)
+
+        def done(results, timings):
+            session["file_name"] = results["conversion"]
+            process_label.config(text=f"Battery data processed: {results['conversion']}\n{timings}", foreground="green")
+            step4_frame.pack(fill="x", pady=10, padx=10)
+
+        run_job([("wait", wait), ("capture", capture), ("conversion", conversion)], process_label, process_data_btn, process_widgets, done)
 
     process_data_btn = ttk.Button(
         step3_frame,
@@ -240,6 +355,7 @@ def create_pages(app):
         command=on_process_data
     )
     process_data_btn.pack(anchor="e")
+    process_widgets = job_widgets(step3_frame)
 
     # --- STEP 4: Generate output files (initially hidden) ---
     step4_frame = ttk.LabelFrame(
@@ -258,6 +374,7 @@ def create_pages(app):
     output_csv_var = BooleanVar(value=True)
     output_html_var = BooleanVar(value=True)
     output_graphic_var = BooleanVar(value=False)
+    session_cache_var = BooleanVar(value=False)
 
     check_csv = ttk.Checkbutton(
         step4_frame, text="CSV", variable=output_csv_var
@@ -271,6 +388,9 @@ def create_pages(app):
     check_csv.pack(anchor="w")
     check_html.pack(anchor="w")
     check_graphic.pack(anchor="w")
+    ttk.Checkbutton(
+        step4_frame, text=f"Keep the session tables in cache/ (up to {session_cache.CACHE_SIZE} MB)", variable=session_cache_var
+    ).pack(anchor="w", pady=(5, 0))
 
     output_label = ttk.Label(
         step4_frame,
@@ -280,13 +400,11 @@ def create_pages(app):
     output_label.pack(anchor="w", pady=(0, 10))
 
     def on_generate():
-        output_label.config(text="Generating output files...", foreground="orange")
-        app.update_idletasks()
         if not session.get("file_name") or not session.get("start") or not session.get("stop"):
             output_label.config(text="Missing session data. Please complete previous steps.", foreground="red")
             return
 
-        # Respecte la logique CLI : on génère toujours le CSV si CSV ou HTML est coché
+        # Même logique que la CLI : le HTML est rendu depuis la table des intervalles, sans passer par le CSV
         output_formats = []
         if output_csv_var.get():
             output_formats.append("csv")
@@ -303,32 +421,49 @@ def create_pages(app):
         start_ts = to_timestamp_ms(session["start"])
         stop_ts = to_timestamp_ms(session["stop"])
 
-        generated = []
-        csv_path = None
-
-        # Génération CSV (toujours si CSV ou HTML demandé, comme dans la CLI)
-        csv.generate_files(session["file_name"])
-        csv_path = csv.process_csv_file(start_ts, stop_ts)
-        session["csv_path"] = csv_path
-
-        if "csv" in output_formats and csv_path:
-            generated.append(f"CSV: {csv_path}")
-
-        if "html" in output_formats and csv_path:
-            html_content = html.process_html_file(csv_path)
-            html_path = csv_path.rsplit(".", 1)[0] + ".html"
-            with open(html_path, "w", encoding="utf-8") as f:
-                f.write(html_content)
-            generated.append(f"HTML: {html_path}")
-
-        if not generated:
-            output_label.config(text="Please select at least one output format.", foreground="red")
-        else:
-            output_label.config(
-                text="Files generated:\n" + "\n".join(generated),
-                foreground="green"
-            )
-            generate_btn.config(state="disabled")
+        use_cache = session_cache_var.get()
+
+        def load_tables(job):
+            job.progress("Loading session tables...")
+            if use_cache:
+                return session_cache.cached_session(csv.DUMP_DIR / session["file_name"])
+            # Sans cache, la fenêtre d'enregistrement est appliquée dès la lecture des tables
+            return csv.generate_files(session["file_name"], init_test_time=start_ts, end_test_time=stop_ts), None
+
+        def intervals(job):
+            tables, session_intervals = job.results["tables"]
+            return csv.interval_table(start_ts, stop_ts, tables, session_intervals)
+
+        def write_csv(job):
+            output_df = job.results["intervals"]
+            if "csv" in output_formats and output_df is not None:
+                return csv.write_csv_file(output_df, stem + ".csv")
+
+        def write_html(job):
+            output_df = job.results["intervals"]
+            if "html" in output_formats and output_df is not None:
+                # Rendu direct depuis la table des intervalles, sans relire le CSV
+                return html.process_html_frame(output_df, stem + ".html")
+
+        def done(results, timings):
+            generated = []
+            if results["csv"]:
+                session["csv_path"] = results["csv"]
+                generated.append(f"CSV: {results['csv']}")
+            if results["html"]:
+                generated.append(f"HTML: {results['html']}")
+            if not generated:
+                output_label.config(text="No interval found in the recording window.", foreground="red")
+                generate_btn.config(state="normal")
+            else:
+                output_label.config(
+                    text="Files generated:\n" + "\n".join(generated) + f"\n{timings}",
+                    foreground="green"
+                )
+
+        stem = csv.output_stem()
+        stages = [("tables", load_tables), ("intervals", intervals), ("csv", write_csv), ("html", write_html)]
+        run_job(stages, output_label, generate_btn, generate_widgets, done)
 
     generate_btn = ttk.Button(
         step4_frame,
@@ -337,6 +472,7 @@ def create_pages(app):
         command=on_generate
     )
     generate_btn.pack(anchor="e")
+    generate_widgets = job_widgets(step4_frame)
 
     add_footer(data_session_page)
     pages["data_session"] = data_session_page
@@ -365,6 +501,8 @@ def create_pages(app):
         foreground="white"
     ).pack(pady=(0, 20))
 
+    upload_table = {"table": None}
+
     def upload_csv():
         file_path = filedialog.askopenfilename(
             filetypes=[("CSV files", "*.csv")],
@@ -373,45 +511,17 @@ def create_pages(app):
         if not file_path:
             return
 
+        # Table virtuelle : fichier indexé en arrière-plan, seules les lignes visibles sont lues
+        close_table()
         try:
-            with open(file_path, newline='', encoding='utf-8') as csvfile:
-                reader = pycsv.reader(csvfile)
-                rows = list(reader)
+            upload_table["table"] = table_view.VirtualTable(content_frame, app, file_path)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to read CSV file:\n{e}")
-            return
-
-        for widget in content_frame.pack_slaves():
-            if isinstance(widget, ttk.Treeview) or isinstance(widget, ttk.Scrollbar):
-                widget.destroy()
-
-        if rows:
-            columns = rows[0]
-            table_frame = ttk.Frame(content_frame)
-            table_frame.pack(pady=10, fill="both", expand=True)
-
-            tree = ttk.Treeview(
-                table_frame,
-                columns=columns,
-                show="headings",
-                height=10
-            )
-            for col in columns:
-                tree.heading(col, text=col)
-                tree.column(col, width=100, anchor="center")
-            for row in rows[1:]:
-                tree.insert("", "end", values=row)
-
-            vsb = ttk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
-            hsb = ttk.Scrollbar(table_frame, orient="horizontal", command=tree.xview)
-            tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
-
-            tree.grid(row=0, column=0, sticky="nsew")
-            vsb.grid(row=0, column=1, sticky="ns")
-            hsb.grid(row=1, column=0, sticky="ew")
 
-            table_frame.grid_rowconfigure(0, weight=1)
-            table_frame.grid_columnconfigure(0, weight=1)
+    def close_table():
+        if upload_table["table"]:
+            upload_table["table"].destroy()
+            upload_table["table"] = None
 
     upload_btn = ttk.Button(
         content_frame,
@@ -422,6 +532,7 @@ def create_pages(app):
     upload_btn.pack(pady=10)
 
     def refresh_table():
+        close_table()
         for widget in content_frame.pack_slaves():
             if isinstance(widget, ttk.Frame):
                 widget.destroy()
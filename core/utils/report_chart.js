@@ -0,0 +1,215 @@
+            // Graphique en ligne sur canvas, inclus tel quel dans le rapport : aucune dépendance réseau
+            const createLineChart = (canvas, options) => {
+                const ctx = canvas.getContext('2d');
+                const margin = { left: 80, right: 20, top: 30, bottom: 50 };
+                const chart = {
+                    label: options.label,
+                    yLabel: options.yLabel,
+                    line: { x: [], y: [] },
+                    band: { x: [], low: [], high: [] },
+                    onZoom: null
+                };
+                let scale = null;
+                let hover = null;
+                let dragStart = null;
+                let dragEnd = null;
+
+                const niceStep = (span, count) => {
+                    const raw = span / Math.max(1, count);
+                    const power = Math.pow(10, Math.floor(Math.log10(raw)));
+                    const unit = raw / power;
+                    return (unit <= 1 ? 1 : unit <= 2 ? 2 : unit <= 5 ? 5 : 10) * power;
+                };
+
+                const ticks = (lo, hi, count) => {
+                    const step = niceStep(hi - lo, count);
+                    const values = [];
+                    for (let value = Math.ceil(lo / step) * step; value <= hi; value += step) values.push(value);
+                    return values;
+                };
+
+                const extent = (arrays) => {
+                    let lo = Infinity, hi = -Infinity;
+                    for (const values of arrays) {
+                        for (let i = 0; i < values.length; i++) {
+                            const value = values[i];
+                            if (value < lo) lo = value;
+                            if (value > hi) hi = value;
+                        }
+                    }
+                    if (!(lo <= hi)) return [0, 1];
+                    if (lo === hi) return [lo - 1, hi + 1];
+                    return [lo, hi];
+                };
+
+                const resize = () => {
+                    const ratio = window.devicePixelRatio || 1;
+                    canvas.width = canvas.clientWidth * ratio;
+                    canvas.height = canvas.clientHeight * ratio;
+                    ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+                };
+
+                // Tracé par segments : une valeur manquante (NaN) coupe la ligne
+                const tracePath = (x, y, moveFirst) => {
+                    let drawing = !moveFirst;
+                    for (let i = 0; i < x.length; i++) {
+                        if (!Number.isFinite(y[i])) {
+                            drawing = false;
+                            continue;
+                        }
+                        if (drawing) ctx.lineTo(scale.px(x[i]), scale.py(y[i]));
+                        else ctx.moveTo(scale.px(x[i]), scale.py(y[i]));
+                        drawing = true;
+                    }
+                };
+
+                const drawBand = () => {
+                    const { x, low, high } = chart.band;
+                    let start = 0;
+                    ctx.fillStyle = 'rgba(75, 192, 192, 0.2)';
+                    while (start < x.length) {
+                        while (start < x.length && !(Number.isFinite(low[start]) && Number.isFinite(high[start]))) start++;
+                        let end = start;
+                        while (end < x.length && Number.isFinite(low[end]) && Number.isFinite(high[end])) end++;
+                        if (end > start) {
+                            ctx.beginPath();
+                            for (let i = start; i < end; i++) ctx.lineTo(scale.px(x[i]), scale.py(high[i]));
+                            for (let i = end - 1; i >= start; i--) ctx.lineTo(scale.px(x[i]), scale.py(low[i]));
+                            ctx.closePath();
+                            ctx.fill();
+                        }
+                        start = end;
+                    }
+                };
+
+                const drawAxes = (width, height) => {
+                    ctx.strokeStyle = '#ddd';
+                    ctx.fillStyle = '#666';
+                    ctx.lineWidth = 1;
+                    ctx.font = '12px sans-serif';
+                    ctx.textAlign = 'center';
+                    ctx.textBaseline = 'top';
+                    for (const value of ticks(scale.x0, scale.x1, Math.max(2, Math.floor((width - margin.left - margin.right) / 180)))) {
+                        const x = scale.px(value);
+                        ctx.beginPath();
+                        ctx.moveTo(x, margin.top);
+                        ctx.lineTo(x, height - margin.bottom);
+                        ctx.stroke();
+                        ctx.fillText(options.formatX(value), x, height - margin.bottom + 6);
+                    }
+                    ctx.textAlign = 'right';
+                    ctx.textBaseline = 'middle';
+                    for (const value of ticks(scale.y0, scale.y1, Math.max(2, Math.floor((height - margin.top - margin.bottom) / 50)))) {
+                        const y = scale.py(value);
+                        ctx.beginPath();
+                        ctx.moveTo(margin.left, y);
+                        ctx.lineTo(width - margin.right, y);
+                        ctx.stroke();
+                        ctx.fillText(Number(value.toPrecision(6)).toString(), margin.left - 6, y);
+                    }
+                    ctx.textAlign = 'center';
+                    ctx.textBaseline = 'bottom';
+                    ctx.fillText(options.xLabel, (margin.left + width - margin.right) / 2, height - 4);
+                    ctx.fillText(chart.label, (margin.left + width - margin.right) / 2, margin.top - 8);
+                    ctx.save();
+                    ctx.translate(14, (margin.top + height - margin.bottom) / 2);
+                    ctx.rotate(-Math.PI / 2);
+                    ctx.textBaseline = 'middle';
+                    ctx.fillText(chart.yLabel, 0, 0);
+                    ctx.restore();
+                };
+
+                const drawTooltip = (width) => {
+                    const { x, y } = chart.line;
+                    const i = hover;
+                    const px = scale.px(x[i]);
+                    const text = `${options.formatX(x[i])} : ${Number.isFinite(y[i]) ? y[i] : '-'}`;
+                    ctx.strokeStyle = '#999';
+                    ctx.beginPath();
+                    ctx.moveTo(px, margin.top);
+                    ctx.lineTo(px, canvas.clientHeight - margin.bottom);
+                    ctx.stroke();
+                    ctx.font = '12px sans-serif';
+                    const boxWidth = ctx.measureText(text).width + 12;
+                    const left = Math.min(px + 8, width - margin.right - boxWidth);
+                    ctx.fillStyle = 'rgba(0, 0, 0, 0.75)';
+                    ctx.fillRect(left, margin.top + 4, boxWidth, 22);
+                    ctx.fillStyle = '#fff';
+                    ctx.textAlign = 'left';
+                    ctx.textBaseline = 'middle';
+                    ctx.fillText(text, left + 6, margin.top + 15);
+                };
+
+                chart.draw = () => {
+                    resize();
+                    const width = canvas.clientWidth;
+                    const height = canvas.clientHeight;
+                    const [x0, x1] = extent([chart.line.x, chart.band.x]);
+                    const [y0, y1] = extent([chart.line.y, chart.band.low, chart.band.high]);
+                    scale = {
+                        x0, x1, y0, y1,
+                        px: (value) => margin.left + (value - x0) / (x1 - x0) * (width - margin.left - margin.right),
+                        py: (value) => height - margin.bottom - (value - y0) / (y1 - y0) * (height - margin.top - margin.bottom),
+                        vx: (pixel) => x0 + (pixel - margin.left) / (width - margin.left - margin.right) * (x1 - x0)
+                    };
+                    ctx.clearRect(0, 0, width, height);
+                    drawAxes(width, height);
+                    drawBand();
+                    ctx.strokeStyle = 'rgba(75, 192, 192, 1)';
+                    ctx.lineWidth = 2;
+                    ctx.beginPath();
+                    tracePath(chart.line.x, chart.line.y, true);
+                    ctx.stroke();
+                    if (dragStart !== null && dragEnd !== null) {
+                        ctx.fillStyle = 'rgba(0, 0, 0, 0.1)';
+                        ctx.fillRect(Math.min(dragStart, dragEnd), margin.top, Math.abs(dragEnd - dragStart), height - margin.top - margin.bottom);
+                    }
+                    if (hover !== null && hover < chart.line.x.length) drawTooltip(width);
+                };
+
+                const nearest = (pixel) => {
+                    const x = chart.line.x;
+                    if (!x.length) return null;
+                    const value = scale.vx(pixel);
+                    let lo = 0, hi = x.length - 1;
+                    while (lo < hi) {
+                        const mid = (lo + hi) >> 1;
+                        if (x[mid] < value) lo = mid + 1; else hi = mid;
+                    }
+                    return lo > 0 && value - x[lo - 1] < x[lo] - value ? lo - 1 : lo;
+                };
+
+                // Zoom : sélection d'une plage à la souris, double-clic pour revenir
+                canvas.addEventListener('mousedown', (event) => {
+                    dragStart = event.offsetX;
+                    dragEnd = null;
+                });
+                canvas.addEventListener('mousemove', (event) => {
+                    if (!scale) return;
+                    if (dragStart !== null) dragEnd = event.offsetX;
+                    hover = nearest(event.offsetX);
+                    chart.draw();
+                });
+                canvas.addEventListener('mouseup', (event) => {
+                    if (dragStart !== null && Math.abs(event.offsetX - dragStart) > 5 && chart.onZoom) {
+                        const a = scale.vx(dragStart);
+                        const b = scale.vx(event.offsetX);
+                        dragStart = dragEnd = null;
+                        chart.onZoom([Math.min(a, b), Math.max(a, b)]);
+                        return;
+                    }
+                    dragStart = dragEnd = null;
+                    chart.draw();
+                });
+                canvas.addEventListener('mouseleave', () => {
+                    hover = null;
+                    dragStart = dragEnd = null;
+                    chart.draw();
+                });
+                canvas.addEventListener('dblclick', () => {
+                    if (chart.onZoom) chart.onZoom(null);
+                });
+                window.addEventListener('resize', () => chart.draw());
+                return chart;
+            };
+
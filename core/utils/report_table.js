@@ -0,0 +1,143 @@
+            // Lignes filtrées puis triées, en indices : exécuté dans le Worker (via son code source) ou sur le thread principal
+            function queryRows(columns, search, sortColumn, sortOrder) {
+                const size = columns.length ? (columns[0].codes || columns[0]).length : 0;
+                let order = new Int32Array(size);
+                for (let i = 0; i < size; i++) order[i] = i;
+                if (search) {
+                    search = search.toLowerCase();
+                    const tests = columns.map((column) => {
+                        if (column.codes) {
+                            const matches = column.labels.map((label) => label.toLowerCase().includes(search));
+                            return (i) => matches[column.codes[i]];
+                        }
+                        return (i) => !Number.isNaN(column[i]) && String(column[i]).includes(search);
+                    });
+                    let count = 0;
+                    for (let i = 0; i < size; i++) {
+                        if (tests.some((test) => test(i))) order[count++] = i;
+                    }
+                    order = order.slice(0, count);
+                }
+                if (sortColumn !== null) {
+                    const column = columns[sortColumn];
+                    let keys = column;
+                    if (column.codes) {
+                        // Libellés triés une fois, puis comparaison des rangs
+                        const ranks = new Float64Array(column.labels.length);
+                        column.labels
+                            .map((label, code) => [label, code])
+                            .sort((a, b) => a[0].localeCompare(b[0], undefined, { numeric: true }))
+                            .forEach(([, code], rank) => { ranks[code] = rank; });
+                        keys = Float64Array.from(column.codes, (code) => ranks[code]);
+                    }
+                    const direction = sortOrder === 'desc' ? -1 : 1;
+                    order.sort((a, b) => {
+                        const x = keys[a], y = keys[b];
+                        if (Number.isNaN(x)) return Number.isNaN(y) ? a - b : 1;  // valeurs manquantes en dernier
+                        if (Number.isNaN(y)) return -1;
+                        return (x - y) * direction || a - b;
+                    });
+                }
+                return order;
+            }
+
+            // Tableau virtualisé : seules les lignes visibles (et quelques voisines) sont dans le DOM
+            const createDataTable = (container, tableData) => {
+                const OVERSCAN = 10;
+                const tbody = container.querySelector('tbody');
+                const columns = tableData.values;
+                const size = columns.length ? (columns[0].codes || columns[0]).length : 0;
+                const escapeText = (text) => text.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+                const cells = columns.map((column) => {
+                    if (column.codes) {
+                        const labels = column.labels.map(escapeText);
+                        return (i) => labels[column.codes[i]];
+                    }
+                    return (i) => Number.isNaN(column[i]) ? '' : String(column[i]);
+                });
+                const table = { order: null, onQuery: null };
+                let rowHeight = 36;
+                let pending = false;
+                let queryId = 0;
+                let worker = null;
+
+                const spacer = (height) => `<tr class="spacer"><td colspan="${columns.length}" style="height: ${height}px; padding: 0; border: 0;"></td></tr>`;
+
+                table.render = () => {
+                    pending = false;
+                    const total = table.order ? table.order.length : size;
+                    const first = Math.max(0, Math.floor(container.scrollTop / rowHeight) - OVERSCAN);
+                    const last = Math.min(total, first + Math.ceil(container.clientHeight / rowHeight) + 2 * OVERSCAN);
+                    const html = [spacer(first * rowHeight)];
+                    for (let r = first; r < last; r++) {
+                        const i = table.order ? table.order[r] : r;
+                        html.push(`<tr class="${r % 2 ? 'even' : ''}"><td>${cells.map((cell) => cell(i)).join('</td><td>')}</td></tr>`);
+                    }
+                    html.push(spacer((total - last) * rowHeight));
+                    tbody.innerHTML = html.join('');
+                    // Hauteur réelle d'une ligne, mesurée une fois qu'il y en a une à l'écran
+                    const row = tbody.rows[1];
+                    if (last > first && row && row.getBoundingClientRect().height && Math.abs(row.getBoundingClientRect().height - rowHeight) > 0.5) {
+                        rowHeight = row.getBoundingClientRect().height;
+                        table.render();
+                    }
+                };
+
+                const show = (order) => {
+                    table.order = order;
+                    container.scrollTop = 0;
+                    table.render();
+                    if (table.onQuery) table.onQuery(order ? order.length : size);
+                };
+
+                const createWorker = () => {
+                    try {
+                        const source = `${queryRows.toString()}
+                            let columns = null;
+                            onmessage = (event) => {
+                                if (event.data.columns) {
+                                    columns = event.data.columns;
+                                    return;
+                                }
+                                const order = queryRows(columns, event.data.search, event.data.sortColumn, event.data.sortOrder);
+                                postMessage({ id: event.data.id, order: order }, [order.buffer]);
+                            };`;
+                        const created = new Worker(URL.createObjectURL(new Blob([source], { type: 'text/javascript' })));
+                        created.postMessage({ columns: columns });
+                        return created;
+                    } catch (error) {
+                        return null;  // pas de Worker (navigateur, fichier local restreint) : thread principal
+                    }
+                };
+
+                table.query = (search, sortColumn, sortOrder) => {
+                    const id = ++queryId;
+                    if (!search && sortColumn === null) {
+                        show(null);
+                        return;
+                    }
+                    if (worker) {
+                        worker.onmessage = (event) => {
+                            if (event.data.id === queryId) show(event.data.order);
+                        };
+                        worker.onerror = () => {
+                            worker = null;
+                            if (id === queryId) show(queryRows(columns, search, sortColumn, sortOrder));
+                        };
+                        worker.postMessage({ id: id, search: search, sortColumn: sortColumn, sortOrder: sortOrder });
+                        return;
+                    }
+                    show(queryRows(columns, search, sortColumn, sortOrder));
+                };
+
+                container.addEventListener('scroll', () => {
+                    if (!pending) {
+                        pending = true;
+                        requestAnimationFrame(table.render);
+                    }
+                });
+                worker = typeof Worker === 'undefined' ? null : createWorker();
+                table.render();
+                return table;
+            };
+
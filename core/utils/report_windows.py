@@ -0,0 +1,34 @@
+# Fichier --windows : lu par powdroid.py avant l'installation des dépendances, donc sans pandas
+
+def parse_bound(value):
+    # (ms, relatif) : "+5000" est relatif au début de la session
+    if value.startswith("+"):
+        return int(value[1:]), True
+    return int(value), False
+
+def parse_windows(path):
+    # Une fenêtre par ligne : label,start,stop en ms
+    windows = []
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, start=1):
+            line = line.split("#", 1)[0].strip()
+            if not line or line.lower().replace(" ", "") == "label,start,stop":
+                continue
+            try:
+                label, start, stop = [field.strip() for field in line.split(",")]
+                windows.append((label, parse_bound(start), parse_bound(stop)))
+            except ValueError as e:
+                raise ValueError(f"{path}, line {number}: expected 'label,start,stop' in ms ({e})")
+    return windows
+
+def resolve_windows(windows, session_start=None):
+    # Bornes absolues (label, start, stop) une fois le début de la session connu
+    resolved = []
+    for label, *bounds in windows:
+        times = []
+        for value, relative in bounds:
+            if relative and session_start is None:
+                raise ValueError(f"window {label}: relative time without session start")
+            times.append(session_start + value if relative else value)
+        resolved.append((label, *times))
+    return resolved
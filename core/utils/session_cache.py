@@ -0,0 +1,91 @@
+import hashlib
+import os
+import pickle
+import shutil
+import threading
+import time
+import pandas
+from pathlib import Path
+from . import csv_handler as csv
+
+CACHE_DIR = Path(os.getcwd()) / "cache"
+CACHE_SIZE = 512  # MB, au-delà les entrées les moins récemment utilisées sont supprimées
+HASH_CHUNK_SIZE = 1024 * 1024
+CODE_FILES = ["csv_handler.py", "history_parser.py", "session_cache.py"]
+
+def code_version():
+    # Toute modification du code de traitement invalide le cache
+    digest = hashlib.sha256()
+    for name in CODE_FILES:
+        digest.update((Path(__file__).resolve().parent / name).read_bytes())
+    return digest.hexdigest()[:16]
+
+def session_key(path):
+    digest = hashlib.sha256(code_version().encode())
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def entry_size(entry):
+    try:
+        return sum(path.stat().st_size for path in entry.iterdir())
+    except OSError:
+        return 0  # supprimée entre-temps par un autre processus
+
+def load_session(key, cache_dir=None):
+    entry = Path(cache_dir or CACHE_DIR) / key
+    try:
+        tables = {metric: pandas.read_pickle(entry / f"{metric}.pkl") for metric in csv.METRICS}
+        with open(entry / "intervals.pkl", "rb") as f:
+            intervals = pickle.load(f)
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError, AttributeError):
+        return None
+    os.utime(entry)  # date d'accès pour l'éviction LRU
+    return tables, intervals
+
+def store_session(key, tables, intervals, cache_dir=None, max_size=CACHE_SIZE):
+    cache_dir = Path(cache_dir or CACHE_DIR)
+    entry = cache_dir / key
+    partial = cache_dir / f".{key}.{os.getpid()}.{threading.get_ident()}"
+    partial.mkdir(parents=True, exist_ok=True)
+    try:
+        for metric, table in tables.items():
+            table.to_pickle(partial / f"{metric}.pkl")
+        with open(partial / "intervals.pkl", "wb") as f:
+            pickle.dump(intervals, f, protocol=pickle.HIGHEST_PROTOCOL)
+        # Renommage atomique : un autre processus ne voit jamais d'entrée incomplète
+        os.replace(partial, entry)
+    except OSError:
+        shutil.rmtree(partial, ignore_errors=True)
+        if not entry.is_dir():
+            raise
+    evict(cache_dir, max_size)
+
+def evict(cache_dir=None, max_size=CACHE_SIZE):
+    cache_dir = Path(cache_dir or CACHE_DIR)
+    sizes = {entry: entry_size(entry) for entry in cache_dir.iterdir() if entry.is_dir() and not entry.name.startswith(".")}
+    entries = sorted(sizes, key=lambda entry: entry.stat().st_mtime if entry.exists() else 0)
+    total = sum(sizes.values())
+    # L'entrée la plus récente est toujours gardée, même si elle dépasse à elle seule la limite
+    for entry in entries[:-1]:
+        if total <= max_size * 1024 * 1024:
+            break
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= sizes[entry]
+
+def cached_session(path, max_size=CACHE_SIZE, cache_dir=None, timings=False):
+    # (tables, table des intervalles de la session) depuis le cache, ou calculées puis mises en cache
+    start = time.perf_counter()
+    key = session_key(path)
+    cached = load_session(key, cache_dir)
+    if cached:
+        if timings:
+            print(f"[PowDroid] Session loaded from cache in {time.perf_counter() - start:.2f}s")
+        return cached
+    tables = csv.generate_files(path)
+    intervals = csv.session_intervals(tables)
+    store_session(key, tables, intervals, cache_dir, max_size)
+    if timings:
+        print(f"[PowDroid] Session computed and cached in {time.perf_counter() - start:.2f}s")
+    return tables, intervals
@@ -0,0 +1,198 @@
+import numpy
+from tkinter import ttk
+from . import background_jobs as jobs
+from . import csv_index
+
+ROW_HEIGHT = 20  # hauteur d'une ligne du Treeview si le thème ne la donne pas
+HEADING_HEIGHT = 25
+JOB_LABELS = {"index": "Loading", "sort": "Sorting", "filter": "Filtering"}
+
+class VirtualTable:
+    # Treeview qui ne contient que les lignes visibles, relues à chaque défilement depuis un CsvIndex.
+    # Indexation, tri et filtre tournent dans des BackgroundJob ; la vue est un tableau d'indices de lignes.
+    def __init__(self, parent, app, path):
+        self.app = app
+        self.index = csv_index.CsvIndex(path)
+        self.order = None  # tri courant (indices de lignes), None = ordre du fichier
+        self.mask = None  # filtre courant (booléen par ligne), None = toutes les lignes
+        self.view = None
+        self.first = 0
+        self.visible = 10
+        self.sort_column = None
+        self.descending = False
+        self.job = None
+
+        self.frame = ttk.Frame(parent)
+        self.frame.pack(pady=10, fill="both", expand=True)
+
+        toolbar = ttk.Frame(self.frame)
+        toolbar.grid(row=0, column=0, columnspan=2, sticky="ew", pady=(0, 5))
+        self.filter_entry = ttk.Entry(toolbar, width=30)
+        self.filter_entry.pack(side="left")
+        self.filter_entry.bind("<Return>", lambda event: self.apply_filter())
+        ttk.Button(toolbar, text="Filter", takefocus=0, command=self.apply_filter).pack(side="left", padx=5)
+        self.cancel_btn = ttk.Button(toolbar, text="Cancel", takefocus=0, command=self.cancel, state="disabled")
+        self.cancel_btn.pack(side="left")
+        self.status_label = ttk.Label(toolbar, text="", font=("Segoe UI", 9))
+        self.status_label.pack(side="right")
+        self.progress = ttk.Progressbar(toolbar, mode="determinate", maximum=100, length=200)
+        self.progress.pack(side="right", padx=10)
+
+        columns = [f"c{i}" for i in range(len(self.index.header))]
+        self.tree = ttk.Treeview(self.frame, columns=columns, show="headings", selectmode="browse")
+        for i, (column, name) in enumerate(zip(columns, self.index.header)):
+            self.tree.heading(column, text=name, command=lambda i=i: self.sort(i))
+            self.tree.column(column, width=100, anchor="center")
+
+        self.vsb = ttk.Scrollbar(self.frame, orient="vertical", command=self.yview)
+        hsb = ttk.Scrollbar(self.frame, orient="horizontal", command=self.tree.xview)
+        self.tree.configure(xscrollcommand=hsb.set)
+
+        self.tree.grid(row=1, column=0, sticky="nsew")
+        self.vsb.grid(row=1, column=1, sticky="ns")
+        hsb.grid(row=2, column=0, sticky="ew")
+        self.frame.grid_rowconfigure(1, weight=1)
+        self.frame.grid_columnconfigure(0, weight=1)
+
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<MouseWheel>", lambda event: self.scroll(-1 if event.delta > 0 else 1, "units"))
+        self.tree.bind("<Button-4>", lambda event: self.scroll(-1, "units"))
+        self.tree.bind("<Button-5>", lambda event: self.scroll(1, "units"))
+
+        self.run("index", self.index.build, on_done=lambda rows: self.set_status(f"{rows} rows"))
+
+    # --- Vue ---
+    def total(self):
+        return len(self.view) if self.view is not None else self.index.row_count()
+
+    def update_view(self):
+        view = self.order
+        if self.mask is not None:
+            view = numpy.flatnonzero(self.mask) if view is None else view[self.mask[view]]
+        self.view = view
+        self.first = 0
+        self.render()
+
+    def render(self):
+        total = self.total()
+        self.first = max(0, min(self.first, total - self.visible))
+        last = min(total, self.first + self.visible)
+        indices = self.view[self.first:last] if self.view is not None else range(self.first, last)
+        self.tree.delete(*self.tree.get_children())
+        for row in self.index.rows(indices):
+            self.tree.insert("", "end", values=row)
+        if total:
+            self.vsb.set(self.first / total, last / total)
+        else:
+            self.vsb.set(0, 1)
+
+    def on_resize(self, event):
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or ROW_HEIGHT)
+        visible = max(1, (event.height - HEADING_HEIGHT) // row_height)
+        if visible != self.visible:
+            self.visible = visible
+            self.render()
+
+    def scroll(self, amount, what):
+        self.first += amount * (self.visible if what == "pages" else 1)
+        self.render()
+
+    def yview(self, *args):
+        if args[0] == "moveto":
+            self.first = int(float(args[1]) * self.total())
+            self.render()
+        elif args[0] == "scroll":
+            self.scroll(int(args[1]), args[2])
+
+    # --- Tâches de fond ---
+    def set_status(self, text, color=None):
+        self.status_label.config(text=text, foreground=color or "")
+
+    def run(self, name, function, on_done):
+        # Une seule tâche à la fois : la nouvelle annule la précédente
+        if self.job:
+            self.job.cancel()
+
+        def stage(job):
+            return function(cancel=job.cancelled, progress=lambda done, total: job.progress(min(1.0, done / total) if total else 1.0))
+
+        def on_progress(stage_name, index, count, fraction):
+            if self.job is not job:
+                return
+            self.progress.config(value=100 * (fraction or 0))
+            if name == "index":
+                self.set_status(f"{JOB_LABELS[name]}... {self.index.row_count()} rows indexed")
+            else:
+                self.set_status(f"{JOB_LABELS[name]}...")
+            if name == "index" and self.view is None:
+                self.render()  # les premières lignes s'affichent pendant l'indexation
+
+        def finish():
+            if self.job is not job:
+                return False
+            self.job = None
+            self.progress.config(value=0)
+            self.cancel_btn.config(state="disabled")
+            return True
+
+        def done(results):
+            if finish():
+                on_done(results[name])
+                self.render()
+
+        def error(e):
+            if finish():
+                self.set_status(f"Error: {e}", "red")
+
+        def cancelled():
+            if finish():
+                self.set_status("Cancelled.", "red")
+
+        job = jobs.BackgroundJob(self.app, [(name, stage)], on_progress, done, error, cancelled)
+        self.job = job
+        self.cancel_btn.config(state="normal")
+        job.start()
+
+    def cancel(self):
+        if self.job:
+            self.job.cancel()
+
+    def sort(self, column):
+        if not self.index.complete:
+            self.set_status("Please wait for the file to be loaded.", "orange")
+            return
+        descending = column == self.sort_column and not self.descending
+
+        def on_done(order):
+            self.order, self.sort_column, self.descending = order, column, descending
+            for i, name in enumerate(self.index.header):
+                arrow = (" ▼" if descending else " ▲") if i == column else ""
+                self.tree.heading(f"c{i}", text=name + arrow)
+            self.update_view()
+            self.set_status(f"{self.total()} rows sorted by {self.index.header[column]}")
+
+        self.run("sort", lambda cancel, progress: self.index.sort_order(column, descending, cancel, progress), on_done)
+
+    def apply_filter(self):
+        if not self.index.complete:
+            self.set_status("Please wait for the file to be loaded.", "orange")
+            return
+        text = self.filter_entry.get()
+        if not text:
+            self.mask = None
+            self.update_view()
+            self.set_status(f"{self.total()} rows")
+            return
+
+        def on_done(mask):
+            self.mask = mask
+            self.update_view()
+            self.set_status(f"{self.total()} / {self.index.row_count()} rows match '{text}'")
+
+        self.run("filter", lambda cancel, progress: self.index.filter_mask(text, cancel, progress), on_done)
+
+    def destroy(self):
+        self.cancel()
+        self.job = None
+        self.frame.destroy()
+        self.index.close()
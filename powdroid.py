@@ -2,12 +2,23 @@ import os
 import subprocess
 import sys
 import argparse
+import importlib.util
 import signal
 
+MIN_WORKER_MEMORY = 512  # Mo : l'espace d'adressage réservé par les imports d'un worker dépasse déjà 330 Mo
+
 def handle_exit(signum, frame):
     print("[PowDroid] INFO | Execution interrupted. Exiting...")
     sys.exit(0)
 
+def needs_go(directory):
+    # Même règle que replay() : Battery Historian ne sert qu'à convertir un battery_device.zip pas encore converti
+    for path, subdirs, files in os.walk(directory):
+        subdirs[:] = [d for d in subdirs if d != "cache"]
+        if "battery_device.zip" in files and "battery_device.csv" not in files:
+            return True
+    return False
+
 def main():
     signal.signal(signal.SIGINT, handle_exit)
 
@@ -19,25 +30,124 @@ def main():
     parser = CustomArgumentParser()
     parser.add_argument(
         "-o", "--output",
-        help="output format (csv, html, or both separated by comma)",
+        help="output format (csv, html, parquet, feather, arrow, or several separated by comma)",
         metavar="EXT"
     )
     parser.add_argument("-v", "--verbose", action="store_true", help="verbose mode for debugging")
     parser.add_argument("-t", "--traceback", action="store_true", help="traceback mode for analysis")
+    parser.add_argument("-c", "--cache", action="store_true", help="keep the per-metric tables in tmp/ as CSV files")
+    parser.add_argument(
+        "-m", "--memory-budget",
+        type=float,
+        help="read the battery history in chunks of this size (in MB), keeping only the rows of the recording window; the kept rows come on top of it",
+        metavar="MB"
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=float,
+        default=0,
+        help="enable the session cache in cache/ with this size, least recently used sessions are evicted beyond it (disabled by default, e.g. 512)",
+        metavar="MB"
+    )
+    parser.add_argument(
+        "-p", "--parser",
+        choices=["go", "python"],
+        default="go",
+        help="battery history parser: Battery Historian (go, default) or the built-in Python parser"
+    )
+    parser.add_argument(
+        "--capture",
+        choices=["full", "lite"],
+        default="full",
+        help="full: batterystats and bugreport (default), lite: battery history only (implies --parser python)"
+    )
+    parser.add_argument(
+        "-s", "--stream",
+        action="store_true",
+        help="parse the battery history while it is captured (implies --capture lite and --parser python)"
+    )
+    parser.add_argument("-d", "--multi-device", action="store_true", help="profile all connected devices in parallel")
+    parser.add_argument("-w", "--workers", type=int, help="number of devices processed at the same time (default: up to 8)", metavar="N")
+    parser.add_argument(
+        "-l", "--live",
+        help="collect the battery history during the session over adb TCP at this device address (implies --parser python)",
+        metavar="HOST[:PORT]"
+    )
+    parser.add_argument("--live-interval", type=float, default=30, help="seconds between two live collections (default: 30)", metavar="S")
+    parser.add_argument(
+        "--windows",
+        help="CSV file of labelled windows 'label,start,stop' in ms (+ms is relative to the session start), one report per window",
+        metavar="FILE"
+    )
+    parser.add_argument("--replay", help="process an existing dump directory without device nor prompt", metavar="DIR")
+    parser.add_argument("--start", type=int, help="start of the replayed window in ms (default: from DIR/session.json)", metavar="MS")
+    parser.add_argument("--stop", type=int, help="end of the replayed window in ms (default: from DIR/session.json)", metavar="MS")
+    parser.add_argument("--batch", help="replay every dump found under ROOT on a process pool (see -w), resuming from ROOT/manifest.jsonl", metavar="ROOT")
+    parser.add_argument(
+        "--worker-memory",
+        type=float,
+        help=f"address space limit (RLIMIT_AS, not resident memory) of each --batch worker process, at least {MIN_WORKER_MEMORY} MB",
+        metavar="MB"
+    )
+    parser.add_argument("--timings", action="store_true", help="report the time spent capturing and converting battery data")
     args = parser.parse_args()
 
     output_formats = []
     if args.output:
         output_formats = args.output.split(",")
         for ext in output_formats:
-            if ext not in ["csv", "html"]:
-                print(f"[Debug] ERROR | Invalid output format: {ext}. Allowed formats are 'csv' and 'html'.")
+            if ext not in ["csv", "html", "parquet", "feather", "arrow"]:
+                print(f"[Debug] ERROR | Invalid output format: {ext}. Allowed formats are 'csv', 'html', 'parquet', 'feather' and 'arrow'.")
                 return
+        if set(output_formats) & {"parquet", "feather", "arrow"} and importlib.util.find_spec("pyarrow") is None:
+            print("[Debug] ERROR | The parquet, feather and arrow formats need the pyarrow module. Run 'pip install pyarrow' to install it.")
+            return
 
     if (args.verbose or args.traceback) and not output_formats:
         print("[Debug] ERROR | The -o, --output argument is required when -v or -t is used.")
         return
 
+    if args.replay and args.batch:
+        print("[Debug] ERROR | The --replay and --batch arguments cannot be used together.")
+        return
+
+    for directory in (args.replay, args.batch):
+        if directory and not os.path.isdir(directory):
+            print(f"[Debug] ERROR | Dump directory not found: {directory}")
+            return
+
+    windows = None
+    if args.windows:
+        if not os.path.isfile(args.windows):
+            print(f"[Debug] ERROR | Windows file not found: {args.windows}")
+            return
+        from core.utils.report_windows import parse_windows
+        try:
+            windows = parse_windows(args.windows)
+        except (ValueError, UnicodeDecodeError) as e:
+            print(f"[Debug] ERROR | Invalid windows file: {e}")
+            return
+        if not windows:
+            print(f"[Debug] ERROR | No window found in {args.windows}.")
+            return
+
+    if args.worker_memory is not None and args.worker_memory < MIN_WORKER_MEMORY:
+        print(f"[Debug] ERROR | --worker-memory limits the address space of each worker, which needs at least {MIN_WORKER_MEMORY} MB.")
+        return
+
+    if (args.replay or args.batch) and not output_formats:
+        output_formats = ["csv"]
+
+    if args.live and args.multi_device:
+        print("[Debug] ERROR | The -l, --live argument profiles a single device and cannot be used with -d.")
+        return
+
+    if args.stream:
+        args.capture = "lite"  # le bugreport ne servirait pas : le CSV vient de l'historique analysé en direct
+
+    if args.capture == "lite" or args.stream or args.live:
+        args.parser = "python"
+
     if len(output_formats) > 1:
         print(f"[PowDroid] INFO | Multiple output formats selected: {', '.join(output_formats)}")
     
@@ -46,6 +156,10 @@ def main():
         setup_command = [sys.executable, setup_path]
         if args.verbose:
             setup_command.append("--verbose")
+        if args.parser == "python" or ((args.replay or args.batch) and not needs_go(args.replay or args.batch)):
+            setup_command.append("--no-go")
+        if args.replay or args.batch:
+            setup_command.append("--no-adb")
         try:
             subprocess.run(setup_command, check=True)
         except subprocess.CalledProcessError as e:
@@ -58,7 +172,7 @@ def main():
     if len(sys.argv) > 1:
         from cli.cli_interface import main as cli_main
         # cli_main(output_formats, verbose=args.verbose, traceback=args.traceback)
-        cli_main(output_formats, verbose=args.verbose)
+        cli_main(output_formats, verbose=args.verbose, cache=args.cache, memory_budget=args.memory_budget, timings=args.timings, parser=args.parser, capture=args.capture, stream=args.stream, multi_device=args.multi_device, workers=args.workers, live_address=args.live, live_interval=args.live_interval, cache_size=args.cache_size, windows=windows, replay_dir=args.replay, replay_start=args.start, replay_stop=args.stop, batch_root=args.batch, worker_memory=args.worker_memory)
     else:
         from gui.gui_interface import main as gui_main
         gui_main()
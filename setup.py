@@ -52,7 +52,15 @@ def check_gui_modules():
         print("[PowDroid] INFO | GUI modules (pandas, matplotlib, ttkbootstrap) are not fully installed.")
         print("[PowDroid] └── If you wish to use the GUI, run: pip install pandas matplotlib ttkbootstrap")
 
-def check_go_runtime():
+def check_columnar_modules():
+    try:
+        import pyarrow
+        print("[PowDroid] OK | The pyarrow module is installed (parquet, feather and arrow outputs).")
+    except ImportError:
+        print("[PowDroid] INFO | The pyarrow module is not installed, parquet, feather and arrow outputs are disabled.")
+        print("[PowDroid] └── If you wish to use them, run: pip install pyarrow")
+
+def check_go_runtime(required=True):
     if command_in_path("go"):
         try:
             result = subprocess.run(["go", "version"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
@@ -60,6 +68,8 @@ def check_go_runtime():
         except Exception as e:
             print(f"[Debug] An error occurred while checking the Go runtime: {e}")
             raise SystemExit("[Debug] Exiting due to Go runtime check error.")
+    elif not required:
+        print("[PowDroid] INFO | Go runtime is not installed, the built-in Python history parser will be used.")
     else:
         print("[Debug] Error | Go runtime is not installed or not in the PATH.")
         print("[Debug] └── Please ensure that the Go runtime is installed and configured as described in the README.")
@@ -82,15 +92,16 @@ def initialize_adb_server(verbose=False):
 def handle_exit(sig, frame):
     sys.exit(0)
 
-def main(verbose=False):
+def main(verbose=False, require_go=True, require_adb=True):
     signal.signal(signal.SIGINT, handle_exit)
     print("[PowDroid] INFO | System configuration check...\n")
     errors = []
 
-    try:
-        check_android_sdk()
-    except SystemExit as e:
-        errors.append(str(e))
+    if require_adb:
+        try:
+            check_android_sdk()
+        except SystemExit as e:
+            errors.append(str(e))
 
     try:
         check_python_version()
@@ -103,16 +114,18 @@ def main(verbose=False):
         errors.append(str(e))
 
     check_gui_modules()
+    check_columnar_modules()
 
     try:
-        check_go_runtime()
+        check_go_runtime(required=require_go)
     except SystemExit as e:
         errors.append(str(e))
 
-    try:
-        initialize_adb_server(verbose=verbose)
-    except SystemExit as e:
-        errors.append(str(e))
+    if require_adb:
+        try:
+            initialize_adb_server(verbose=verbose)
+        except SystemExit as e:
+            errors.append(str(e))
 
     if errors:
         if signal.getsignal(signal.SIGINT) is not None:
@@ -124,4 +137,4 @@ def main(verbose=False):
 
 if __name__ == "__main__":
     verbose_flag = "--verbose" in sys.argv
-    main(verbose=verbose_flag)
+    main(verbose=verbose_flag, require_go="--no-go" not in sys.argv, require_adb="--no-adb" not in sys.argv)
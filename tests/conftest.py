@@ -0,0 +1,35 @@
+import socket
+import sys
+from pathlib import Path
+import pytest
+
+# Les tests importent les modules du dépôt comme powdroid.py (core.utils, tools)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from core.utils import adb_client
+from core.utils import adb_runner as adb
+from tools.fake_adb_server import FakeAdbServer
+
+HISTORY = b"9,h,0:RESET:TIME:1700000000000\n" * 20000  # plusieurs blocs de 64 Ko
+
+def unused_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture
+def fake_adb(monkeypatch):
+    # Faux serveur adb sur un port libre, avec le téléphone A branché
+    server = FakeAdbServer({"A": "device"}, {"dumpsys batterystats": HISTORY}).start()
+    monkeypatch.setattr(adb_client, "ADB_HOST", "127.0.0.1")
+    monkeypatch.setattr(adb_client, "ADB_PORT", server.address[1])
+    monkeypatch.setattr(adb, "client", adb_client.AdbClient())
+    yield server
+    adb.client.close()
+    server.stop()
+
+@pytest.fixture
+def no_adb_server(monkeypatch):
+    monkeypatch.setattr(adb_client, "ADB_HOST", "127.0.0.1")
+    monkeypatch.setattr(adb_client, "ADB_PORT", unused_port())
+    monkeypatch.setattr(adb, "client", adb_client.AdbClient())
@@ -0,0 +1,66 @@
+import socket
+import sys
+import pytest
+from core.utils import adb_client
+from core.utils import adb_runner as adb
+
+def test_client_pool_is_refilled_after_a_stream(fake_adb):
+    client = adb_client.AdbClient(pool_size=2)
+    try:
+        client.warm_up()
+        assert len(client.idle) == 2
+        assert client.devices() == {"A": "device"}
+        assert len(client.idle) == 1
+        client.shell("A", "echo")
+        assert len(client.idle) == 2
+    finally:
+        client.close()
+    assert client.idle == []
+
+def test_client_retries_a_dropped_pooled_connection(fake_adb):
+    client = adb_client.AdbClient()
+    dropped, peer = socket.socketpair()
+    peer.close()
+    client.idle.append(dropped)
+    try:
+        assert client.devices() == {"A": "device"}
+    finally:
+        client.close()
+
+def test_shell_and_exec_output(fake_adb):
+    client = adb_client.AdbClient()
+    try:
+        assert client.shell("A", "dumpsys", "batterystats") == fake_adb.commands["dumpsys batterystats"]
+        assert b"".join(client.exec_out(None, "dumpsys", "batterystats", "-c")) == fake_adb.commands["dumpsys batterystats"]
+        assert client.shell("A", "unknown") == b""
+    finally:
+        client.close()
+    assert "shell:dumpsys batterystats" in fake_adb.requests
+    assert "exec:dumpsys batterystats -c" in fake_adb.requests
+
+def test_shell_on_missing_device(fake_adb):
+    client = adb_client.AdbClient()
+    with pytest.raises(adb_client.AdbError, match="not found"):
+        client.shell("B", "echo")
+
+def test_stream_batterystats_history(fake_adb, tmp_path):
+    lines = list(adb.stream_batterystats_history("A", tee_path=tmp_path / "batterystats.txt"))
+    assert len(lines) == 20000
+    assert lines[0] == "9,h,0:RESET:TIME:1700000000000\n"
+    assert (tmp_path / "batterystats.txt").read_bytes() == fake_adb.commands["dumpsys batterystats"]
+
+def test_adb_stream_falls_back_to_subprocess(no_adb_server, monkeypatch):
+    commands = []
+
+    def adb_command(device, *args):
+        commands.append((device, *args))
+        return [sys.executable, "-c", "import sys; sys.stdout.write('fallback output')"]
+
+    monkeypatch.setattr(adb, "adb_command", adb_command)
+    assert b"".join(adb.adb_stream("A", "exec", "dumpsys", "batterystats")) == b"fallback output"
+    assert commands == [("A", "exec-out", "dumpsys", "batterystats")]
+
+def test_device_dir_name():
+    assert adb.device_dir_name("192.168.1.5:5555") == "192.168.1.5_5555"
+    assert adb.device_dir_name("emulator-5554") == "emulator-5554"
+    assert adb.device_dir_name("adb-R58M/_adb-tls-connect._tcp") == "adb-R58M__adb-tls-connect._tcp"
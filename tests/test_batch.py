@@ -0,0 +1,42 @@
+import json
+import os
+import time
+from cli import cli_interface as cli
+
+def fake_session(dump_dir, *args):
+    # Session de test : "crash" fait tomber son processus, les autres réussissent après un court traitement
+    with open(os.path.join(dump_dir, "runs.txt"), "a", encoding="utf-8") as f:
+        f.write("run\n")
+    if os.path.basename(dump_dir) == "crash":
+        os._exit(1)
+    time.sleep(0.05)
+    return {"session": dump_dir, "status": "done", "seconds": 0.05}
+
+def make_sessions(root, names):
+    for name in names:
+        (root / name).mkdir()
+        (root / name / "battery_device.csv").write_text("metric,type,start_time,end_time,value,opt\n", encoding="utf-8")
+
+def test_batch_only_fails_the_crashing_session(tmp_path):
+    names = [f"s{i:02d}" for i in range(11)] + ["crash"]
+    make_sessions(tmp_path, names)
+
+    failed = cli.batch(tmp_path, workers=2, task=fake_session)
+
+    records = cli.read_manifest(tmp_path / cli.MANIFEST_FILE)
+    assert failed == [(tmp_path / "crash").resolve()]
+    assert records[str((tmp_path / "crash").resolve())]["error"] == "worker process crashed"
+    for name in names[:-1]:
+        assert records[str((tmp_path / name).resolve())]["status"] == "done"
+    # Chaque record n'est écrit qu'une fois, et le crash n'est rejoué seul que WORKER_ATTEMPTS fois
+    lines = (tmp_path / cli.MANIFEST_FILE).read_text(encoding="utf-8").splitlines()
+    assert len(lines) == len(names)
+    assert len((tmp_path / "crash" / "runs.txt").read_text().splitlines()) <= 1 + cli.WORKER_ATTEMPTS
+
+def test_batch_resumes_from_the_manifest(tmp_path):
+    make_sessions(tmp_path, ["a", "b"])
+    (tmp_path / cli.MANIFEST_FILE).write_text(json.dumps({"session": str((tmp_path / "a").resolve()), "status": "done"}) + "\n", encoding="utf-8")
+
+    assert cli.batch(tmp_path, workers=2, task=fake_session) == []
+    assert not (tmp_path / "a" / "runs.txt").exists()
+    assert (tmp_path / "b" / "runs.txt").exists()
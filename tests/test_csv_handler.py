@@ -0,0 +1,40 @@
+from pathlib import Path
+import pytest
+from core.utils import csv_handler as csv
+from core.utils import history_parser as history
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+BASE = 1700000000000
+
+@pytest.fixture
+def dump(tmp_path, monkeypatch):
+    monkeypatch.setattr(csv, "DUMP_DIR", tmp_path)
+    history.convert(FIXTURES / "history_checkin.txt", tmp_path / "battery_device.csv")
+    return "battery_device.csv"
+
+@pytest.mark.parametrize("init, end", [(BASE + 1200, BASE + 2500), (BASE, BASE + 3000), (BASE + 1000, BASE + 1500)])
+def test_window_pushdown_keeps_the_interval_table(dump, init, end):
+    expected = csv.interval_table(init, end, csv.generate_files(dump))
+    windowed = csv.generate_files(dump, init_test_time=init, end_test_time=end)
+    chunked = csv.generate_files(dump, memory_budget=0.001, init_test_time=init, end_test_time=end)
+    assert csv.interval_table(init, end, windowed).equals(expected)
+    assert csv.interval_table(init, end, chunked).equals(expected)
+
+def test_window_pushdown_drops_rows_outside_the_window(dump):
+    full = csv.generate_files(dump)
+    windowed = csv.generate_files(dump, init_test_time=BASE + 1600, end_test_time=BASE + 1800)
+    # Voltage : la ligne [0, 1500] finit avant la fenêtre
+    assert len(full["Voltage"]) == 2 and windowed["Voltage"]["value"].tolist() == [3990]
+
+def test_chunked_read_across_many_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(csv, "DUMP_DIR", tmp_path)
+    with open(tmp_path / "battery_device.csv", "w", encoding="utf-8") as f:
+        f.write("metric,type,start_time,end_time,value,opt\n")
+        for i in range(3000):
+            t = BASE + i * 1000
+            f.write(f"Voltage,int,{t},{t + 1000},{4000 - i % 7},\nScreen,bool,{t},{t + 500},true,\nTop app,service,{t},{t + 1000},app{i % 3},10123\n")
+    init, end = BASE + 1000500, BASE + 2000250
+    expected = csv.interval_table(init, end, csv.generate_files("battery_device.csv"))
+    chunked = csv.generate_files("battery_device.csv", memory_budget=0.001, init_test_time=init, end_test_time=end)  # morceaux de 1000 lignes
+    assert csv.interval_table(init, end, chunked).equals(expected)
+    assert len(chunked["Voltage"]) == 1002  # fenêtre plus la première ligne qui la suit
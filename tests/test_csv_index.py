@@ -0,0 +1,33 @@
+import pytest
+from core.utils import csv_index
+
+def write_rows(path, count):
+    # Chaque ligne a un champ entre guillemets sur deux lignes : 2 guillemets par ligne
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("id,text\n")
+        for i in range(count):
+            f.write(f'{i},"first {i}\nsecond {i}"\n')
+
+@pytest.mark.parametrize("chunk_size", [csv_index.INDEX_CHUNK_SIZE, 7, 64])
+def test_quoted_newlines_with_256_quotes(tmp_path, monkeypatch, chunk_size):
+    monkeypatch.setattr(csv_index, "INDEX_CHUNK_SIZE", chunk_size)
+    path = tmp_path / "rows.csv"
+    write_rows(path, 128)  # 256 guillemets dans un seul bloc par défaut
+    index = csv_index.CsvIndex(path)
+    try:
+        assert index.build() == 128
+        assert index.rows([0, 127]) == [["0", "first 0\nsecond 0"], ["127", "first 127\nsecond 127"]]
+    finally:
+        index.close()
+
+def test_sort_and_filter(tmp_path):
+    path = tmp_path / "rows.csv"
+    path.write_text("name,value\nb,2\na,\nc,10\n", encoding="utf-8")
+    index = csv_index.CsvIndex(path)
+    try:
+        index.build()
+        assert index.sort_order(1).tolist() == [0, 2, 1]  # valeur manquante en dernier
+        assert index.sort_order(1, descending=True).tolist() == [2, 0, 1]
+        assert index.filter_mask("C").tolist() == [False, False, True]
+    finally:
+        index.close()
@@ -0,0 +1,108 @@
+import queue
+import threading
+import pytest
+from core.utils import adb_runner as adb
+
+TIMEOUT = 5
+
+def run_in_thread(function, *args):
+    thread = threading.Thread(target=function, args=args, daemon=True)
+    thread.start()
+    return thread
+
+def test_device_watcher_events(fake_adb):
+    events = queue.Queue()
+    watcher = adb.DeviceWatcher(lambda kind, value: events.put((kind, value)))
+    watcher.start()
+    try:
+        assert events.get(timeout=TIMEOUT) == ("connected", "A")
+        fake_adb.plug("B")
+        assert events.get(timeout=TIMEOUT) == ("connected", "B")
+        fake_adb.plug("C", "unauthorized")
+        fake_adb.unplug("A")
+        assert events.get(timeout=TIMEOUT) == ("disconnected", "A")
+    finally:
+        watcher.stop()
+        watcher.join(TIMEOUT)
+    assert not watcher.is_alive()
+    assert events.empty()  # pas d'événement "error" après stop()
+
+def test_device_watcher_reports_unreachable_server(no_adb_server):
+    events = queue.Queue()
+    watcher = adb.DeviceWatcher(lambda kind, value: events.put((kind, value)))
+    watcher.start()
+    watcher.join(TIMEOUT)
+    assert events.get(timeout=TIMEOUT)[0] == "error"
+
+def test_online_devices_updates_tracks_devices(fake_adb):
+    updates = adb.online_devices_updates()
+    try:
+        assert next(updates) == ["A"]
+        fake_adb.plug("B", "offline")
+        assert next(updates) == ["A"]
+        fake_adb.plug("B")
+        assert next(updates) == ["A", "B"]
+    finally:
+        updates.close()
+    assert "host:track-devices" in fake_adb.requests
+
+def test_online_devices_updates_falls_back_to_polling(no_adb_server, monkeypatch):
+    polls = iter([[], ["A"], ["A", "B"]])
+    monkeypatch.setattr(adb, "get_connected_devices", lambda: next(polls))
+    monkeypatch.setattr(adb.time, "sleep", lambda seconds: None)
+    updates = adb.online_devices_updates()
+    assert [next(updates) for _ in range(3)] == [[], ["A"], ["A", "B"]]
+    updates.close()
+
+def test_wait_for_device_connection(fake_adb):
+    fake_adb.set_devices({})
+    thread = run_in_thread(adb.wait_for_device_connection, False)
+    thread.join(0.3)
+    assert thread.is_alive()
+    fake_adb.plug("A")
+    thread.join(TIMEOUT)
+    assert not thread.is_alive()
+
+def test_wait_for_devices_connection(fake_adb):
+    thread = run_in_thread(adb.wait_for_devices_connection, ["A", "B"], False)
+    thread.join(0.3)
+    assert thread.is_alive()
+    fake_adb.plug("B")
+    thread.join(TIMEOUT)
+    assert not thread.is_alive()
+
+def test_wait_for_device_disconnection_of_one_device(fake_adb):
+    fake_adb.plug("B")
+    thread = run_in_thread(adb.wait_for_device_disconnection, False, "A")
+    fake_adb.unplug("B")
+    thread.join(0.3)
+    assert thread.is_alive()  # seul A est attendu
+    fake_adb.unplug("A")
+    thread.join(TIMEOUT)
+    assert not thread.is_alive()
+
+def test_device_watcher_wait_for(fake_adb, monkeypatch):
+    monkeypatch.setattr(adb, "WATCH_INTERVAL", 0.05)
+    watcher = adb.DeviceWatcher(lambda kind, value: None)
+    watcher.start()
+    results = queue.Queue()
+    try:
+        thread = run_in_thread(lambda: results.put(watcher.wait_for(lambda devices: "B" in devices)))
+        thread.join(0.3)
+        assert thread.is_alive()
+        fake_adb.plug("B")
+        assert results.get(timeout=TIMEOUT) is True
+
+        cancel = threading.Event()
+        cancel.set()
+        with pytest.raises(adb.CaptureCancelled):
+            watcher.wait_for(lambda devices: "C" in devices, cancel)
+    finally:
+        watcher.stop()
+        watcher.join(TIMEOUT)
+    assert watcher.wait_for(lambda devices: True) is None  # suivi arrêté
+
+def test_device_watcher_wait_for_without_adb_server(no_adb_server):
+    watcher = adb.DeviceWatcher(lambda kind, value: None)
+    watcher.start()
+    assert watcher.wait_for(lambda devices: True) is None
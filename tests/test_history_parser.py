@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import pytest
+from core.utils import csv_handler as csv
+from core.utils import history_parser as history
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+CHECKIN_BASE = 1700000000000
+HUMAN_BASE = history.parse_human_time("2023-11-14-22-13-20")  # heure locale du téléphone
+
+def expected_rows(base, top_uid):
+    # Même session dans les deux formats, temps relatifs au RESET
+    rows = [
+        ["Voltage", "int", 0, 1500, 4000, ""],
+        ["Voltage", "int", 1500, 3000, 3990, ""],
+        ["Coulomb charge", "int", 0, 3000, 3000, ""],
+        ["Temperature", "int", 0, 3000, 250, ""],
+        ["Battery Level", "int", 0, 3000, 80, ""],
+        ["Screen", "bool", 1000, 3000, "true", ""],
+        ["Wifi radio", "bool", 1000, 2000, "true", ""],
+        ["Top app", "service", 1000, 3000, "com.example.app", top_uid],
+        ["Wakelock_in", "service", 2000, 3000, "*alarm* sync", "1000"],
+    ]
+    return sorted([metric, kind, base + start, base + end, value, opt] for metric, kind, start, end, value, opt in rows)
+
+def sort_rows(rows):
+    return sorted(rows, key=lambda row: (row[0], row[2], row[3]))
+
+@pytest.mark.parametrize("name, base, top_uid", [
+    ("history_checkin.txt", CHECKIN_BASE, "10123"),
+    ("history_human.txt", HUMAN_BASE, "u0a123"),
+])
+def test_parse_fixture(name, base, top_uid):
+    rows = list(history.parse_file(FIXTURES / name))
+    assert sort_rows(rows) == sort_rows(expected_rows(base, top_uid))
+
+@pytest.mark.parametrize("name, base", [("history_checkin.txt", CHECKIN_BASE), ("history_human.txt", HUMAN_BASE)])
+def test_tables_match_csv_metrics(name, base):
+    tables = csv.tables_from_rows(history.parse_file(FIXTURES / name))
+    assert list(tables) == csv.METRICS
+    for metric, table in tables.items():
+        assert list(table.columns) == history.HEADER
+    assert tables["Voltage"]["value"].tolist() == [4000, 3990]
+    assert tables["Wakelock_in"]["value"].tolist() == ["*alarm* sync"]
+    assert tables["GPS"].empty and tables["Camera"].empty
+
+    output_df = csv.interval_table(None, None, tables)
+    assert list(output_df.columns) == csv.COLUMNS
+    assert (output_df["start_time"] - base).tolist() == [0, 1000, 1500, 2000]
+    assert output_df["Screen(ON/OFF)"].tolist() == [False, True, True, True]
+    assert output_df["Wifi radio"].tolist() == [False, True, True, False]
+    assert output_df["Voltage (mV)"].tolist() == [4000, 4000, 3990, 3990]
+    assert output_df["Top app"].fillna("").tolist() == ["", "com.example.app", "com.example.app", "com.example.app"]
+    assert output_df["Wakelock_in (Service)"].fillna("").tolist() == ["", "", "", "*alarm* sync"]
+
+def test_string_pool_events():
+    lines = [
+        '9,hsp,0,10123,"com.example.app"',
+        '9,hsp,1,10124,"com.example.other,with comma"',
+        "9,h,0:RESET:TIME:1000",
+        "9,h,10,+Etp=0",
+        "9,h,10,-Etp=0,+Etp=1",
+        "9,h,10,-Etp=1",
+    ]
+    assert list(history.parse_history(lines)) == [
+        ["Top app", "service", 1010, 1020, "com.example.app", "10123"],
+        ["Top app", "service", 1020, 1030, "com.example.other,with comma", "10124"],
+    ]
+
+def test_bool_transitions():
+    lines = ["9,h,0:RESET:TIME:1000", "9,h,10,+S,+g", "9,h,10,-g", "9,h,10,+S,-S", "9,h,10,-S,+g"]
+    # Un intervalle de durée nulle n'est pas écrit, un "-" sans "+" ouvert est ignoré
+    assert sort_rows(history.parse_history(lines)) == [
+        ["GPS", "bool", 1010, 1020, "true", ""],
+        ["Screen", "bool", 1010, 1030, "true", ""],
+    ]
+
+def test_time_and_reset():
+    lines = [
+        "9,h,0:RESET:TIME:1000",
+        "9,h,0,+S",
+        "9,h,100:TIME:5000",
+        "9,h,50,-S,+g",
+        "9,h,20:RESET:TIME:9000",
+        "9,h,0,+W",
+        "9,h,30,-W",
+    ]
+    assert list(history.parse_history(lines)) == [
+        ["Screen", "bool", 1000, 5050, "true", ""],
+        ["GPS", "bool", 5050, 5070, "true", ""],
+        ["Wifi on", "bool", 9000, 9030, "true", ""],
+    ]
+
+def test_human_quoted_tokens():
+    lines = [
+        "Battery History (0% used, 1 used of 4096KB, 0 strings using 0):",
+        "                    0 (10) RESET:TIME: 2023-11-14-22-13-20",
+        '             +1s000ms (2) 080 +wake_lock_in=1000:"*job* a=b c" +top=u0a1:"com.app"',
+        '             +1m02s003ms (2) 080 -wake_lock_in=1000:"*job* a=b c"',
+    ]
+    rows = [row for row in history.parse_history(lines) if row[0] != "Battery Level"]
+    assert sort_rows(rows) == [
+        ["Top app", "service", HUMAN_BASE + 1000, HUMAN_BASE + 62003, "com.app", "u0a1"],
+        ["Wakelock_in", "service", HUMAN_BASE + 1000, HUMAN_BASE + 62003, "*job* a=b c", "1000"],
+    ]
+
+def test_parse_duration():
+    assert history.parse_duration("+1d02h03m04s005ms") == 93784005
+    assert history.parse_duration("-1s500ms") == -1500
+    assert history.parse_duration("0") == 0
+
+def test_parse_utc_offset():
+    assert history.parse_utc_offset("+0100\n") == timedelta(hours=1)
+    assert history.parse_utc_offset("-05:30") == -timedelta(hours=5, minutes=30)
+    assert history.parse_utc_offset("CET") is None
+
+def test_human_time_in_device_offset():
+    # Le RESET:TIME: est lu dans le fuseau du téléphone, quel que soit celui de l'ordinateur
+    base = int(datetime(2023, 11, 14, 21, 13, 20, tzinfo=timezone.utc).timestamp() * 1000)
+    rows = list(history.parse_file(FIXTURES / "history_human.txt", timedelta(hours=1)))
+    assert sort_rows(rows) == sort_rows(expected_rows(base, "u0a123"))
@@ -0,0 +1,108 @@
+import sys
+import pandas
+from core.utils import adb_runner as adb
+from core.utils import csv_handler as csv
+from core.utils import history_parser as history
+from core.utils import live_collector as live
+
+POOL = ['9,hsp,0,10123,"com.example.app"']
+# (décalage en ms depuis l'enregistrement précédent, éléments) ; le premier est le RESET de l'historique
+RECORDS = [
+    (0, []),
+    (0, ["Bl=80", "Bv=4000"]),
+    (1000, ["+S"]),
+    (500, ["Bv=3990", "+Wr"]),
+    (500, ["-Wr", "+Etp=0"]),
+    (1000, ["-S"]),
+    (500, ["Bv=3980", "-Etp=0"]),
+    (700, ["+S", "Bl=79"]),
+]
+RESET = "0:RESET:TIME:1700000000000"
+
+class EmulatedDevice:
+    # Historique qui grandit pendant la session ; --history-start N reprend à l'enregistrement N
+    # en réimprimant l'état complet, comme le fait batterystats
+    def __init__(self):
+        self.available = len(RECORDS)
+
+    def state_after(self, count):
+        state = {}
+        for _, items in RECORDS[:count]:
+            for item in items:
+                sign = item[0] if item[0] in "+-" else ""
+                name = item[len(sign):]
+                key = name.split("=")[0] if not sign or name.startswith("E") else name
+                if sign == "-":
+                    state.pop(key, None)
+                else:
+                    state[key] = item
+        return list(state.values())
+
+    def history(self, start=0):
+        lines = [f"9,{line}" for line in ["0,i,vers,36,214"]] + POOL
+        records = RECORDS[:self.available]
+        for index in range(start, len(records)):
+            delta, items = records[index]
+            if index == 0:
+                lines.append(f"9,h,{RESET}")
+            elif index == start:
+                elapsed = sum(d for d, _ in records[1:index + 1])
+                lines.append(",".join(["9,h", str(elapsed), *self.state_after(index + 1)]))
+            else:
+                lines.append(",".join(["9,h", str(delta), *items]))
+        lines.append(f"NEXT: {len(records)}")
+        return ("\n".join(lines) + "\n").encode()
+
+    def __call__(self, serial, command):
+        return self.history(int(command.split()[-1]))
+
+def sorted_tables(tables):
+    return {
+        metric: table.sort_values(["start_time", "end_time"]).reset_index(drop=True).astype({"value": object})
+        for metric, table in tables.items()
+    }
+
+def assert_same_tables(tables, expected):
+    tables, expected = sorted_tables(tables), sorted_tables(expected)
+    for metric in csv.METRICS:
+        pandas.testing.assert_frame_equal(tables[metric], expected[metric], check_dtype=False, check_index_type=False)
+
+def full_parse(device):
+    return csv.tables_from_rows(history.parse_history(device.history().decode().splitlines()))
+
+def collector_for(fake_adb, tmp_path, device):
+    fake_adb.commands["dumpsys batterystats -c --history-start"] = device
+    collector = live.LiveCollector("A", interval=3600, dump_dir=tmp_path)
+    collector.start()
+    return collector
+
+def test_deltas_match_the_full_history(fake_adb, tmp_path):
+    device = EmulatedDevice()
+    collector = collector_for(fake_adb, tmp_path, device)
+    for available in (3, 3, 5):
+        device.available = available
+        collector.collect()
+    device.available = len(RECORDS)
+    tables = collector.finish()
+
+    assert collector.deltas == 4
+    assert (tmp_path / "history_checkpoint.txt").read_text() == f"{len(RECORDS)}\n"
+    assert_same_tables(tables, full_parse(device))
+
+def test_failed_last_read_keeps_the_collected_deltas(fake_adb, tmp_path, monkeypatch, capsys):
+    device = EmulatedDevice()
+    collector = collector_for(fake_adb, tmp_path, device)
+    device.available = 6
+    collector.collect()
+
+    # Réseau perdu en fin de session : ni serveur adb ni commande adb utilisable
+    fake_adb.stop()
+    adb.client.close()  # connexions ouvertes d'avance par le client
+    monkeypatch.setattr(adb, "adb_command", lambda device, *args: [sys.executable, "-c", "import sys; sys.exit(1)"])
+    device.available = len(RECORDS)
+    tables = collector.finish()
+
+    assert "Last live collection of A failed" in capsys.readouterr().out
+    device.available = 6
+    assert_same_tables(tables, full_parse(device))
+    assert len(tables["Screen"]) == 1  # intervalle encore ouvert, clos au dernier delta lu
@@ -0,0 +1,180 @@
+import argparse
+import socketserver
+import sys
+import threading
+
+ADB_VERSION = 41
+
+def encode_message(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return f"{len(data):04x}".encode("ascii") + data
+
+def format_devices(devices):
+    return "".join(f"{serial}\t{state}\n" for serial, state in devices.items())
+
+class FakeAdbHandler(socketserver.BaseRequestHandler):
+    def read_exactly(self, size):
+        data = bytearray()
+        while len(data) < size:
+            chunk = self.request.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("client closed the connection")
+            data += chunk
+        return bytes(data)
+
+    def read_request(self):
+        length = int(self.read_exactly(4), 16)
+        return self.read_exactly(length).decode("utf-8")
+
+    def okay(self, message=None):
+        self.request.sendall(b"OKAY" + (encode_message(message) if message is not None else b""))
+
+    def fail(self, message):
+        self.request.sendall(b"FAIL" + encode_message(message))
+
+    def handle(self):
+        fake = self.server.fake
+        try:
+            request = self.read_request()
+            fake.requests.append(request)
+            if request == "host:version":
+                self.okay(f"{ADB_VERSION:04x}")
+            elif request in ("host:devices", "host:devices-l"):
+                self.okay(format_devices(fake.devices))
+            elif request == "host:track-devices":
+                self.track_devices(fake)
+            elif request.startswith("host:connect:"):
+                address = request[len("host:connect:"):]
+                fake.plug(address)
+                self.okay(f"connected to {address}")
+            elif request.startswith(("host:transport:", "host:transport-any")):
+                self.transport(fake, request)
+            else:
+                self.fail(f"unknown host service '{request}'")
+        except (ConnectionError, OSError):
+            pass
+
+    def transport(self, fake, request):
+        online = [serial for serial, state in fake.devices.items() if state == "device"]
+        serial = request[len("host:transport:"):] if request.startswith("host:transport:") else (online[0] if online else None)
+        if serial not in online:
+            self.fail(f"device '{serial}' not found" if serial else "no devices/emulators found")
+            return
+        self.okay()
+        service = self.read_request()
+        fake.requests.append(service)
+        kind, _, command = service.partition(":")
+        if kind == "tcpip":
+            self.okay()
+            self.request.sendall(f"restarting in TCP mode port: {command}\n".encode())
+            return
+        if kind not in ("shell", "exec"):
+            self.fail(f"unknown service '{service}'")
+            return
+        self.okay()
+        output = fake.output(serial, command)
+        for start in range(0, len(output), 64 * 1024):
+            self.request.sendall(output[start:start + 64 * 1024])
+
+    def track_devices(self, fake):
+        with fake.changed:
+            generation = fake.generation
+            devices = dict(fake.devices)
+        self.request.sendall(b"OKAY" + encode_message(format_devices(devices)))
+        while not fake.stopped.is_set():
+            with fake.changed:
+                fake.changed.wait_for(lambda: fake.generation != generation or fake.stopped.is_set(), timeout=0.5)
+                if fake.generation == generation:
+                    continue
+                generation = fake.generation
+                devices = dict(fake.devices)
+            self.request.sendall(encode_message(format_devices(devices)))
+
+class FakeAdbServer:
+    # Imite le protocole hôte du serveur adb, pour faire tourner PowDroid sans téléphone
+    def __init__(self, devices=None, commands=None, host="127.0.0.1", port=0):
+        self.devices = dict(devices or {})
+        self.commands = dict(commands or {})  # "dumpsys batterystats" -> octets ou callable(serial, command)
+        self.requests = []
+        self.generation = 0
+        self.changed = threading.Condition()
+        self.stopped = threading.Event()
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self.server = socketserver.ThreadingTCPServer((host, port), FakeAdbHandler)
+        self.server.daemon_threads = True
+        self.server.fake = self
+        self.thread = None
+
+    @property
+    def address(self):
+        return self.server.server_address
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        with self.changed:
+            self.changed.notify_all()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def output(self, serial, command):
+        # Commande exacte, sinon le plus long préfixe connu ("dumpsys batterystats -c --history-start")
+        prefixes = [key for key in self.commands if command == key or command.startswith(key + " ")]
+        if not prefixes:
+            return b""
+        output = self.commands[max(prefixes, key=len)]
+        return output(serial, command) if callable(output) else output
+
+    def set_devices(self, devices):
+        with self.changed:
+            self.devices = dict(devices)
+            self.generation += 1
+            self.changed.notify_all()
+
+    def plug(self, serial, state="device"):
+        self.set_devices({**self.devices, serial: state})
+
+    def unplug(self, serial):
+        self.set_devices({s: state for s, state in self.devices.items() if s != serial})
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake adb server. Type '+serial' or '-serial' to plug or unplug a device.")
+    parser.add_argument("--port", type=int, default=5038, help="port to listen on (set ANDROID_ADB_SERVER_PORT to use it)")
+    parser.add_argument("--history", help="file returned by 'dumpsys batterystats' commands")
+    parser.add_argument("devices", nargs="*", help="serials of the devices connected at startup")
+    args = parser.parse_args()
+
+    commands = {}
+    if args.history:
+        with open(args.history, "rb") as f:
+            history = f.read()
+        for command in ("dumpsys batterystats", "dumpsys batterystats -c --history-start 0"):
+            commands[command] = history
+    server = FakeAdbServer({serial: "device" for serial in args.devices}, commands, port=args.port).start()
+    print(f"[FakeAdb] Listening on {server.address[0]}:{server.address[1]}")
+    try:
+        for line in sys.stdin:
+            line = line.strip()
+            if line.startswith("+"):
+                server.plug(line[1:])
+            elif line.startswith("-"):
+                server.unplug(line[1:])
+            print(f"[FakeAdb] Devices: {', '.join(server.devices) or 'none'}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+if __name__ == "__main__":
+    main()